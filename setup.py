@@ -13,10 +13,12 @@ package_data = \
 install_requires = \
 ['click>=8.1.3,<9.0.0',
  'holidays>=0.18,<0.19',
- 'inscriptis>=2.3.2,<3.0.0',
  'python-dateutil>=2.7.0,<3.0.0',
  'setuptools>=67.4.0,<68.0.0']
 
+extras_require = \
+{'numpy': ['numpy>=1.21']}
+
 entry_points = \
 {'console_scripts': ['pycal = python_calendar.cli:main']}
 
@@ -34,6 +36,7 @@ setup_kwargs = {
     'packages': packages,
     'package_data': package_data,
     'install_requires': install_requires,
+    'extras_require': extras_require,
     'entry_points': entry_points,
     'python_requires': '>=3.8.0,<4.0.0',
 }
@@ -0,0 +1,4 @@
+import time
+
+# reported as the import time of pycal --timings
+IMPORT_STARTED = time.perf_counter()
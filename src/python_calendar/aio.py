@@ -0,0 +1,244 @@
+import asyncio
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .calendar import HTMLCalendar
+
+
+class RenderCancelled(Exception):
+    """
+    Raised in a worker thread when every waiter of a render has gone.
+    """
+
+
+class RenderJob:
+    """
+    A render in flight. Chunks are collected on the event loop and shared by
+    every waiter, a waiter joining late replays the chunks already rendered.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.chunks = []
+        self.changed = asyncio.Event()
+        # set when no waiter is left, checked by the worker between chunks
+        self.cancelled = threading.Event()
+        self.waiters = 0
+        self.future = None
+
+    def produce(self, chunks):
+        """
+        Render chunks in a worker thread.
+        """
+        for chunk in chunks:
+            if self.cancelled.is_set():
+                raise RenderCancelled()
+            self.loop.call_soon_threadsafe(self.append, chunk)
+
+    def append(self, chunk):
+        self.chunks.append(chunk)
+        self.changed.set()
+
+    async def iter_chunks(self):
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            # chunks are appended before the future is done, both are
+            # scheduled on the loop in order
+            if self.future.done():
+                self.future.result()
+                return
+            self.changed.clear()
+            await self.changed.wait()
+
+
+class AsyncRenderer:
+    """
+    Render calendar pages from coroutines without blocking the event loop.
+
+    Loading holidays and rendering run on a bounded thread pool, concurrent
+    requests for the same page share one render, and a render stops when
+    every request waiting for it is cancelled.
+    """
+
+    def __init__(
+        self,
+        max_workers=4,
+        firstweekday=6,
+        locale=None,
+        width=3,
+        css_content=None,
+        encoding="utf-8",
+    ):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="pycal")
+        self.firstweekday = firstweekday
+        self.locale = locale
+        self.width = width
+        self.css_content = css_content
+        self.encoding = encoding
+        self.lock = threading.Lock()
+        # {(country, financial, subdiv): HTMLCalendar}
+        self.calendars = {}
+        # {(loop, page key): RenderJob}
+        self.jobs = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self, wait=False):
+        for job in self.jobs.values():
+            job.cancelled.set()
+        self.executor.shutdown(wait=wait)
+
+    def get_calendar(self, country=None, financial=None, subdiv=None):
+        """
+        Return a calendar of holiday sources, built on first use.
+        """
+        key = (country, financial, subdiv)
+        with self.lock:
+            cal = self.calendars.get(key)
+            if cal is None:
+                cal = HTMLCalendar(
+                    firstweekday=self.firstweekday,
+                    locale=self.locale,
+                    country=country,
+                    financial=financial,
+                    subdiv=subdiv,
+                    month_cache_size=256,
+                )
+                self.calendars[key] = cal
+        return cal
+
+    def iterformatpage(self, year, sources, month, holidays, today):
+        """
+        Yield encoded chunks of a page, like CalendarServer.render.
+        """
+        cal = self.get_calendar(*sources)
+        ctx = cal.make_context(
+            startmonth=month or 1, num_month=1 if month else 12, today=today
+        )
+        return cal.iterformatyearpage(
+            year,
+            width=1 if month else self.width,
+            css=None,
+            css_content=self.css_content,
+            encoding=self.encoding,
+            holidays=holidays,
+            calendar=not holidays,
+            ctx=ctx,
+        )
+
+    def start(self, year, sources, month, holidays, today):
+        """
+        Return the RenderJob of a page, sharing a render already in flight.
+        """
+        loop = asyncio.get_running_loop()
+        today = today or datetime.date.today()
+        key = (loop, year, sources, month, holidays, today)
+        job = self.jobs.get(key)
+        if job is None:
+            job = self.jobs[key] = RenderJob(loop)
+
+            def render():
+                chunks = self.iterformatpage(year, sources, month, holidays, today)
+                job.produce(chunks)
+
+            def done(future):
+                job.changed.set()
+                if self.jobs.get(key) is job:
+                    del self.jobs[key]
+
+            job.future = loop.run_in_executor(self.executor, render)
+            job.future.add_done_callback(done)
+        return job
+
+    def release(self, job):
+        """
+        Stop the render of job if no waiter is left.
+        """
+        job.waiters -= 1
+        if job.waiters == 0 and not job.future.done():
+            job.cancelled.set()
+            # a render not started yet is dropped from the queue
+            job.future.cancel()
+            # the next request renders again
+            for key, value in list(self.jobs.items()):
+                if value is job:
+                    del self.jobs[key]
+
+    async def stream_year(
+        self,
+        year,
+        country=None,
+        financial=None,
+        subdiv=None,
+        month=None,
+        holidays=False,
+        today=None,
+    ):
+        """
+        Yield encoded chunks of a year, a month or a holiday list page.
+        Close the iterator (contextlib.aclosing) to stop early.
+        """
+        job = self.start(year, (country, financial, subdiv), month, holidays, today)
+        job.waiters += 1
+        try:
+            async for chunk in job.iter_chunks():
+                yield chunk
+        finally:
+            self.release(job)
+
+    async def render_year(
+        self,
+        year,
+        country=None,
+        financial=None,
+        subdiv=None,
+        month=None,
+        holidays=False,
+        today=None,
+    ):
+        """
+        Return an encoded year, month or holiday list page.
+        """
+        job = self.start(year, (country, financial, subdiv), month, holidays, today)
+        job.waiters += 1
+        try:
+            return b"".join([chunk async for chunk in job.iter_chunks()])
+        finally:
+            self.release(job)
+
+
+# renderer of render_year_async and stream_year_async
+default_renderer = None
+default_renderer_lock = threading.Lock()
+
+
+def get_default_renderer():
+    global default_renderer
+    with default_renderer_lock:
+        if default_renderer is None:
+            default_renderer = AsyncRenderer()
+    return default_renderer
+
+
+async def render_year_async(year, **kwargs):
+    """
+    Return an encoded year page rendered off the event loop.
+    Keyword arguments are those of AsyncRenderer.render_year.
+    """
+    return await get_default_renderer().render_year(year, **kwargs)
+
+
+def stream_year_async(year, **kwargs):
+    """
+    Return an async iterator of encoded chunks of a year page rendered off
+    the event loop.
+    """
+    return get_default_renderer().stream_year(year, **kwargs)
@@ -0,0 +1,51 @@
+import hashlib
+import re
+from pathlib import Path
+
+from .util import open_for_write_binary
+
+# hex digits of the content hash in asset names
+ASSET_HASH_LENGTH = 8
+
+CSS_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+
+
+def minify_css(text):
+    """
+    Return text without comments and optional whitespace.
+    Strings are kept as is, spaces around + and ~ are kept for calc().
+    """
+    # comments, unless inside a string
+    text = re.sub(
+        r"(%s)|/\*.*?\*/" % CSS_STRING, lambda m: m.group(1) or "", text, flags=re.S
+    )
+    parts = re.split(r"(%s)" % CSS_STRING, text)
+    for i in range(0, len(parts), 2):
+        part = re.sub(r"\s+", " ", parts[i])
+        part = re.sub(r" ?([{};,>]) ?", r"\1", part)
+        part = re.sub(r": ", ":", part)
+        parts[i] = part.replace(";}", "}")
+    return "".join(parts).strip() + "\n"
+
+
+def css_asset_name(data, stem="calendar"):
+    """
+    Return the file name of a stylesheet named by its content, eg.
+    calendar.3f2a9c1d.css
+    """
+    digest = hashlib.sha256(data).hexdigest()[:ASSET_HASH_LENGTH]
+    return "%s.%s.css" % (stem, digest)
+
+
+def write_css_asset(folder, css_content, stem="calendar"):
+    """
+    Write css_content minified as a content hashed stylesheet in folder and
+    return its file name. An asset that exists is not written again.
+    """
+    data = minify_css(css_content).encode("utf-8")
+    name = css_asset_name(data, stem)
+    path = Path(folder, name)
+    if not path.is_file():
+        with open_for_write_binary(path) as fh:
+            fh.write(data)
+    return name
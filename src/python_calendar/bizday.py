@@ -0,0 +1,193 @@
+import datetime
+from array import array
+
+from .calendar import get_holiday_providers, parse_holiday_sources
+from .holiday_index import HolidayIndex
+
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# years covered by default, around the current year
+DEFAULT_YEARS_BEFORE = 10
+DEFAULT_YEARS_AFTER = 10
+
+
+def parse_weekend(value):
+    """
+    Return a tuple of 7 bools, True for weekend days from monday.
+
+    value is weekday names separated by commas ("sat,sun"), a mask of 7
+    digits where 1 is a weekend day ("0000011"), or weekday numbers.
+    """
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if len(value) == 7 and set(value) <= set("01"):
+            return tuple(c == "1" for c in value)
+        days = set()
+        for name in value.split(","):
+            name = name.strip()[:3]
+            if not name:
+                continue
+            if name not in WEEKDAY_NAMES:
+                raise ValueError(f"invalid weekday: {name}")
+            days.add(WEEKDAY_NAMES.index(name))
+    else:
+        days = set(value)
+        if not days <= set(range(7)):
+            raise ValueError(f"invalid weekdays: {sorted(days)}")
+    mask = tuple(i in days for i in range(7))
+    if all(mask):
+        raise ValueError("every day is a weekend day")
+    return mask
+
+
+def years_around(dates, n=0, weekend=(5, 6)):
+    """
+    Return the range of years of dates, with room for n business days.
+    """
+    workdays = 7 - sum(parse_weekend(weekend))
+    # about 50 weeks of business days a year, less holidays
+    margin = abs(n) // (workdays * 50) + 1
+    return range(min(dates).year - margin, max(dates).year + margin + 1)
+
+
+class BusinessCalendar:
+    """
+    Business days of holiday sources over a range of years.
+
+    A cumulative count of business days is built once, so that queries are
+    O(1) array lookups instead of walking the days.
+    """
+
+    def __init__(
+        self,
+        country=None,
+        financial=None,
+        subdiv=None,
+        years=None,
+        weekend=(5, 6),
+        today=None,
+    ):
+        if years is None:
+            year = (today or datetime.date.today()).year
+            years = range(year - DEFAULT_YEARS_BEFORE, year + DEFAULT_YEARS_AFTER + 1)
+        if not years:
+            raise ValueError("empty range of years")
+        self.years = years
+        self.weekend = parse_weekend(weekend)
+        self.holiday_source = tuple(parse_holiday_sources(country, financial, subdiv))
+        self.holiday_providers = get_holiday_providers(self.holiday_source, subdiv)
+
+        self.start = datetime.date(years[0], 1, 1)
+        self.end = datetime.date(years[-1], 12, 31)
+        self.first = self.start.toordinal()
+        self.num_days = self.end.toordinal() - self.first + 1
+        # holiday flags of days from start, a holiday is not a business day
+        # even on a weekend so that holiday names can be reported
+        self.holiday_names = {}
+        flags = bytearray(self.num_days)
+        weekday = self.start.weekday()
+        i = 0
+        for year in years:
+            index = HolidayIndex.from_sources(self.holiday_providers, year)
+            for k, mask in enumerate(index.bitmap):
+                if mask:
+                    flags[i + k] = 2
+                    self.holiday_names[i + k] = index.names[k]
+                elif self.weekend[(weekday + k) % 7]:
+                    flags[i + k] = 1
+            weekday = (weekday + len(index.bitmap)) % 7
+            i += len(index.bitmap)
+        self.flags = bytes(flags)
+        # cumulative[i] is the number of business days in [start, start + i)
+        self.cumulative = array("l", [0])
+        # positions[k] is the day index of the k-th business day
+        self.positions = array("l")
+        count = 0
+        for i, flag in enumerate(self.flags):
+            if not flag:
+                self.positions.append(i)
+                count += 1
+            self.cumulative.append(count)
+
+    def index(self, date):
+        """
+        Return the day index of date from the start of the range.
+        """
+        i = date.toordinal() - self.first
+        if not 0 <= i < self.num_days:
+            raise ValueError(
+                f"{date} is out of range {self.start} to {self.end} (see years)"
+            )
+        return i
+
+    def date(self, i):
+        return datetime.date.fromordinal(self.first + i)
+
+    def is_business_day(self, date):
+        return not self.flags[self.index(date)]
+
+    def is_holiday(self, date):
+        return self.flags[self.index(date)] == 2
+
+    def get_holiday(self, date):
+        """
+        Return the holiday name of date or None.
+        """
+        return self.holiday_names.get(self.index(date))
+
+    def add_business_days(self, date, n):
+        """
+        Return the n-th business day after date, or before if n is negative.
+        With n == 0, return date if it is a business day or the next one.
+        """
+        i = self.index(date)
+        if n > 0:
+            # business days up to and including date
+            k = self.cumulative[i + 1] + n - 1
+        else:
+            # business days before date
+            k = self.cumulative[i] + n
+        if not 0 <= k < len(self.positions):
+            raise ValueError(
+                f"{date} {n:+d} business days is out of range"
+                f" {self.start} to {self.end} (see years)"
+            )
+        return self.date(self.positions[k])
+
+    def business_days_between(self, start, end):
+        """
+        Return the number of business days in start <= date < end,
+        negative if end is before start.
+        """
+        i = self.index(start)
+        # end may be the day after the range
+        j = end.toordinal() - self.first
+        if j != self.num_days:
+            j = self.index(end)
+        return self.cumulative[j] - self.cumulative[i]
+
+    def is_business_day_batch(self, dates):
+        """
+        Return [bool, ...] of dates.
+        """
+        flags = self.flags
+        return [not flags[self.index(d)] for d in dates]
+
+    def add_business_days_batch(self, dates, n):
+        """
+        Return [date, ...] of add_business_days of dates, n is an int or a
+        sequence of the same length as dates.
+        """
+        if isinstance(n, int):
+            return [self.add_business_days(d, n) for d in dates]
+        if len(dates) != len(n):
+            raise ValueError("dates and n have different lengths")
+        return [self.add_business_days(d, x) for d, x in zip(dates, n)]
+
+    def business_days_between_batch(self, starts, ends):
+        """
+        Return [int, ...] of business_days_between of pairs of starts and ends.
+        """
+        if len(starts) != len(ends):
+            raise ValueError("starts and ends have different lengths")
+        return [self.business_days_between(a, b) for a, b in zip(starts, ends)]
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+# bump when the rendered output changes for the same options
+RENDER_CACHE_VERSION = 2
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def get_package_version(name):
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+class LRUCache:
+    """
+    Size bounded least recently used cache with hit/miss counters.
+    It is safe to share an instance between threads.
+    """
+
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive: {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value = self.data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """
+        Remove entries whose key matches predicate, or all entries.
+        Return the number of removed entries.
+        """
+        with self.lock:
+            if predicate is None:
+                count = len(self.data)
+                self.data.clear()
+                return count
+            keys = [k for k in self.data if predicate(k)]
+            for k in keys:
+                del self.data[k]
+            return len(keys)
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters.
+        """
+        with self.lock:
+            self.data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.data))
+
+
+class DiskCache:
+    """
+    Content addressed cache of rendered bytes stored in a folder.
+    Keys are hashes of the options that produced the content.
+    """
+
+    def __init__(self, folder, max_entries=256):
+        self.folder = Path(folder)
+        self.max_entries = max_entries
+
+    @staticmethod
+    def make_key(**options):
+        data = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return self.folder.joinpath(key + ".bin")
+
+    def get(self, key):
+        """
+        Return the stored bytes of key or None.
+        """
+        path = self.path(key)
+        try:
+            content = path.read_bytes()
+        except OSError:
+            return None
+        # keep recently used entries from being pruned
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    @contextmanager
+    def open_for_write(self, key):
+        """
+        Yield a binary file object, stored under key when the block succeeds.
+        """
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(dir=self.folder, delete=False, mode="w+b") as tmp:
+            try:
+                yield tmp
+            except BaseException:
+                tmp.close()
+                Path(tmp.name).unlink(missing_ok=True)
+                raise
+            tmp.close()
+            os.replace(tmp.name, self.path(key))
+        self.prune()
+
+    def put(self, key, content):
+        with self.open_for_write(key) as fh:
+            fh.write(content)
+
+    def prune(self):
+        """
+        Remove least recently used entries above max_entries.
+        """
+        entries = []
+        for path in self.folder.glob("*.bin"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                pass
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries :]:
+            path.unlink(missing_ok=True)
@@ -1,8 +1,81 @@
 import calendar
+import codecs
 import datetime
 import html
+import sys
+import threading
+from collections import namedtuple
+from typing import Dict
 
-import holidays
+from .cache import LRUCache
+from .grid import build_grid
+from .holiday_index import MAX_SOURCES, HolidayIndex
+from .locale_names import get_locale_names
+
+# State of a single render, so that a calendar can render on many threads.
+# year, month and holidays (HolidayIndex of year) are set for the month rendered.
+RenderContext = namedtuple(
+    "RenderContext",
+    ["startmonth", "num_month", "today", "year", "month", "holidays"],
+    defaults=(None, None, None),
+)
+
+
+def parse_holiday_sources(country=None, financial=None, subdiv=None):
+    """
+    Return [(kind, code, subdiv), ...] of holiday sources.
+
+    country and financial are codes separated by commas, or lists of codes.
+    A country may have its own subdivision as "US-CA", subdiv applies to the
+    other countries.
+    """
+
+    def split(codes):
+        if not codes:
+            return []
+        if isinstance(codes, str):
+            codes = codes.split(",")
+        return [code.strip() for code in codes if code and code.strip()]
+
+    sources = []
+    for code in split(country):
+        code, _, sub = code.partition("-")
+        sources.append(("country", code, sub or subdiv))
+    for code in split(financial):
+        sources.append(("financial", code, None))
+    if not sources:
+        sources.append(("country", None, subdiv))
+    return sources
+
+
+def get_holiday_providers(sources, subdiv=None):
+    """
+    Return [(label, holidays.HolidayBase), ...] of parse_holiday_sources()
+    sources. The label is None if there is a single source.
+    """
+    # holidays is slow to import, load it only when a calendar is built
+    import holidays
+
+    if len(sources) > MAX_SOURCES:
+        raise ValueError(f"up to {MAX_SOURCES} holiday sources are supported")
+    providers = []
+    for kind, code, sub in sources:
+        if kind == "financial":
+            provider = holidays.financial_holidays(code)
+        else:
+            provider = holidays.country_holidays(code, subdiv=sub)
+        label = code if sub is None or sub == subdiv else "%s-%s" % (code, sub)
+        providers.append((label, provider))
+    if len(providers) == 1:
+        providers = [(None, providers[0][1])]
+    return providers
+
+
+# MonthGrid of years kept by a calendar
+GRID_CACHE_SIZE = 16
+
+# cells of formatday by calendar configuration, see build_cell_tables
+cell_tables: Dict[tuple, tuple] = {}
 
 
 class HTMLCalendar(calendar.LocaleHTMLCalendar):
@@ -43,70 +116,299 @@ class HTMLCalendar(calendar.LocaleHTMLCalendar):
         visible_today=False,
         inline_style=False,
         today=None,
+        month_cache_size=0,
     ):
         super().__init__(firstweekday, locale=locale)
-        self.cur_year = None
-        self.cur_month = None
         self.startmonth = startmonth
         self.num_month = num_month
         self.visible_holiday = visible_holiday
         self.visible_today = visible_today
         self.inline_style = inline_style
         self.today = today or datetime.date.today()
-        if financial:
-            self.holidays = holidays.financial_holidays(financial)
-        else:
-            self.holidays = holidays.country_holidays(country, subdiv=subdiv)
+        sources = parse_holiday_sources(country, financial, subdiv)
+        # [(label, provider), ...], names are labeled if there are several sources
+        self.holiday_providers = get_holiday_providers(sources, subdiv)
+        self.holidays = self.holiday_providers[0][1]
+        self.holiday_source = tuple(sources)
+        # css classes of a holiday by bitmask of sources, eg. " holiday-us holiday-jp"
+        self.holiday_cssclasses = [
+            "".join(
+                " holiday-%s" % label.lower()
+                for i, (label, _) in enumerate(self.holiday_providers)
+                if label is not None and mask & (1 << i)
+            )
+            for mask in range(1 << len(self.holiday_providers))
+        ]
+        self.build_cell_tables()
+        self.holiday_indexes = {}
+        self.holiday_lock = threading.Lock()
+        self.grid_cache = LRUCache(GRID_CACHE_SIZE)
+        # cache of formatted months (opt-in)
+        self.month_cache = LRUCache(month_cache_size) if month_cache_size else None
+
+    def get_holiday_index(self, year):
+        """
+        Return the HolidayIndex of year, building it on first use.
+        """
+        index = self.holiday_indexes.get(year)
+        if index is None:
+            # the holidays provider is not thread safe while populating
+            with self.holiday_lock:
+                index = self.holiday_indexes.get(year)
+                if index is None:
+                    index = HolidayIndex.from_sources(self.holiday_providers, year)
+                    self.holiday_indexes[year] = index
+        return index
+
+    def make_context(self, startmonth=None, num_month=None, today=None):
+        """
+        Return a RenderContext, defaults are taken from the calendar.
+        """
+        return RenderContext(
+            startmonth=startmonth or self.startmonth,
+            num_month=num_month or self.num_month,
+            today=today or self.today,
+        )
+
+    def make_month_context(self, theyear, themonth, ctx=None):
+        """
+        Return a RenderContext for rendering a month.
+        """
+        if ctx is None:
+            ctx = self.make_context()
+        return ctx._replace(
+            year=theyear, month=themonth, holidays=self.get_holiday_index(theyear)
+        )
+
+    def itermonths(self, theyear, ctx=None):
+        """
+        Iterate (year, month) pairs rendered for theyear.
+        Months before startmonth belong to the next year.
+        """
+        if ctx is None:
+            ctx = self.make_context()
+        for i in range(ctx.startmonth, ctx.startmonth + ctx.num_month):
+            m = ((i - 1) % 12) + 1
+            y = theyear + 1 if m < ctx.startmonth else theyear
+            yield y, m
+
+    def get_year_grid(self, theyear, today=None):
+        """
+        Return the MonthGrid of the 12 months of theyear, built on first use.
+        """
+        today = today or self.today
+        key = (theyear, self.firstweekday, today)
+        grid = self.grid_cache.get(key)
+        if grid is None:
+            indexes = {theyear: self.get_holiday_index(theyear)}
+            months = [(theyear, m) for m in range(1, 13)]
+            grid = build_grid(months, self.firstweekday, indexes, today)
+            self.grid_cache.put(key, grid)
+        return grid
+
+    def month_weeks(self, theyear, themonth, ctx=None):
+        """
+        Return 6 weeks of (day, weekday, holiday mask, is today) of a month.
+        """
+        today = ctx.today if ctx else self.today
+        return self.get_year_grid(theyear, today).weeks(theyear, themonth)
 
-    def formatday(self, day, weekday):
+    def prepare_holidays(self, theyear, ctx=None):
+        """
+        Build the holiday index of every year rendered for theyear.
+        """
+        for y in sorted({y for y, _ in self.itermonths(theyear, ctx)}):
+            self.get_holiday_index(y)
+
+    def build_cell_tables(self):
+        """
+        Set the precomputed cells of the calendar configuration.
+
+        day_cells[is_today][weekday][day] is the cell of a day without holiday
+        (day 0 is outside the month), holiday_spans[is_today][day] is the
+        content of a holiday cell.
+        """
+        key = (
+            type(self),
+            tuple(self.cssclasses),
+            self.cssclass_noday,
+            self.visible_holiday,
+            self.visible_today,
+            self.inline_style,
+        )
+        tables = cell_tables.get(key)
+        if tables is None:
+            tables = cell_tables[key] = self.make_cell_tables()
+        self.day_cells, self.holiday_spans = tables
+
+    def make_cell_tables(self):
+        noday = sys.intern('<td class="%s">&nbsp;</td>' % self.cssclass_noday)
+        days = range(1, 32)
+        # the day number is the only difference between spans of a kind
+        spans = {
+            (holiday, today): self.formatdayspan("%d", holiday, today)
+            for holiday in (False, True)
+            for today in (False, True)
+        }
+        day_cells = [
+            [
+                [noday]
+                + [
+                    sys.intern(
+                        '<td class="%s">%s</td>' % (css, spans[False, today] % day)
+                    )
+                    for day in days
+                ]
+                for css in self.cssclasses
+            ]
+            for today in (False, True)
+        ]
+        holiday_spans = [
+            [None] + [sys.intern(spans[True, today] % day) for day in days]
+            for today in (False, True)
+        ]
+        return day_cells, holiday_spans
+
+    def formatdayspan(self, day, holiday, today):
+        """
+        Return the content of a day cell.
+        """
+        day = str(day)
+        styles = {}
+
+        if holiday:
+            if self.visible_holiday:
+                day = f"({day})"
+            if self.inline_style:
+                styles["color"] = "red"
+
+        if today:
+            if self.visible_today:
+                day = f"[{day}]"
+            if self.inline_style:
+                styles["background"] = "white"
+                styles.setdefault("color", "black")
+
+        style = "; ".join([f"{k}: {v}" for k, v in styles.items()])
+        return f'<span style="{style}">{day}</span>'
+
+    def formatday(self, day, weekday, ctx, mask=None, is_today=None):
         """
         Return a day as a table cell.
+        ctx is the RenderContext of the month, mask and is_today are looked up
+        unless given by a MonthGrid.
         """
         if day == 0:
             # day outside month
-            return '<td class="%s">&nbsp;</td>' % self.cssclass_noday
-        else:
-            this_date = datetime.date(self.cur_year, self.cur_month, day)
-            holiday_name = self.holidays.get(this_date)
-            css = self.cssclasses[weekday]
-            day = str(day)
-            styles = {}
-
-            if holiday_name:
-                if self.visible_holiday:
-                    day = f"({day})"
-                if self.inline_style:
-                    styles["color"] = "red"
-
-            if this_date == self.today:
-                if self.visible_today:
-                    day = f"[{day}]"
-                if self.inline_style:
-                    styles["background"] = "white"
-                    styles.setdefault("color", "black")
-
-            style = "; ".join([f"{k}: {v}" for k, v in styles.items()])
-            day = f'<span style="{style}">{day}</span>'
-
-            if holiday_name:
-                styles["color"] = "red"
-                css += " holiday"
-                name = html.escape(holiday_name, quote=True)
-                return '<td class="%s" title="%s"><div>%s</div></td>' % (css, name, day)
-            else:
-                return '<td class="%s">%s</td>' % (css, day)
+            return self.day_cells[False][weekday][0]
+        if mask is None:
+            year, month, today = ctx.year, ctx.month, ctx.today
+            mask = ctx.holidays.lookup(month, day)[0]
+            is_today = day == today.day and month == today.month and year == today.year
+        if not mask:
+            return self.day_cells[is_today][weekday][day]
+        css = self.cssclasses[weekday] + " holiday" + self.holiday_cssclasses[mask]
+        name = html.escape(ctx.holidays.get(ctx.month, day), quote=True)
+        return '<td class="%s" title="%s"><div>%s</div></td>' % (
+            css,
+            name,
+            self.holiday_spans[is_today][day],
+        )
+
+    @property
+    def locale_names(self):
+        return get_locale_names(self.locale)
+
+    def formatweekday(self, day):
+        """
+        Return a weekday name as a table header.
+        """
+        return '<th class="%s">%s</th>' % (
+            self.cssclasses_weekday_head[day],
+            self.locale_names.day_abbr[day],
+        )
+
+    def formatmonthname(self, theyear, themonth, withyear=True):
+        """
+        Return a month name as a table row.
+        """
+        s = self.locale_names.month_name[themonth]
+        if withyear:
+            s = "%s %s" % (s, theyear)
+        return '<tr><th colspan="7" class="%s">%s</th></tr>' % (
+            self.cssclass_month_head,
+            s,
+        )
 
-    def formatweek(self, theweek):
+    def formatweek(self, theweek, ctx):
         """
-        Return a complete week as a table row.
+        Return a complete week of month_weeks as a table row.
         """
-        s = "".join(self.formatday(d, wd) for (d, wd) in theweek)
+        s = "".join(
+            self.formatday(d, wd, ctx, mask, today) for d, wd, mask, today in theweek
+        )
         return '<tr class="days">%s</tr>' % s
 
-    def formatmonth(self, theyear, themonth, withyear=True):
+    @property
+    def marks_today(self):
+        """
+        True if today is rendered differently from other days.
+        """
+        return self.visible_today or self.inline_style
+
+    def month_cache_key(self, theyear, themonth, withyear=True, ctx=None):
+        """
+        Return the key of a formatted month in month_cache.
+        """
+        today = ctx.today if ctx else self.today
+        # only the month containing today depends on the date, if marked
+        if self.marks_today and (today.year, today.month) == (theyear, themonth):
+            today_key = today.day
+        else:
+            today_key = None
+        return (
+            theyear,
+            themonth,
+            withyear,
+            self.firstweekday,
+            self.locale,
+            self.holiday_source,
+            self.visible_holiday,
+            self.visible_today,
+            self.inline_style,
+            today_key,
+        )
+
+    def invalidate_month_cache(self, year=None, month=None):
+        """
+        Drop cached months of year and/or month, or the whole cache.
+        Return the number of dropped months.
+        """
+        if self.month_cache is None:
+            return 0
+        return self.month_cache.invalidate(
+            lambda key: (year is None or key[0] == year)
+            and (month is None or key[1] == month)
+        )
+
+    def formatmonth(self, theyear, themonth, withyear=True, ctx=None):
         """
         Return a formatted month as a table.
         """
+        if self.month_cache is None:
+            return self.formatmonth_nocache(theyear, themonth, withyear, ctx)
+        key = self.month_cache_key(theyear, themonth, withyear, ctx)
+        v = self.month_cache.get(key)
+        if v is None:
+            v = self.formatmonth_nocache(theyear, themonth, withyear, ctx)
+            self.month_cache.put(key, v)
+        return v
+
+    def formatmonth_nocache(self, theyear, themonth, withyear=True, ctx=None):
+        """
+        Return a formatted month as a table, bypassing month_cache.
+        """
+        ctx = self.make_month_context(theyear, themonth, ctx)
         v = []
         a = v.append
         a('<table class="%s">' % (self.cssclass_month))
@@ -116,54 +418,100 @@ class HTMLCalendar(calendar.LocaleHTMLCalendar):
         a(self.formatweekheader())
         a("\n")
 
-        # make noday cells (7days * 6week - {days in month})
-        arr = self.monthdays2calendar(theyear, themonth)
-        arr = arr + [[(0, 0)] * 7] * (6 - len(arr))
-
-        for week in arr:
-            a(self.formatweek(week))
+        # 6 weeks, with noday cells outside the month
+        for week in self.month_weeks(theyear, themonth, ctx):
+            a(self.formatweek(week, ctx))
             a("\n")
         a("</table>")
         a("\n")
         return "".join(v)
 
-    def itermonthdates_just_month(self, year, month):
-        d = datetime.date(year, month, 1)
-        m = month + 1
-        y = year + m // 12
-        m = (month % 12) + 1
-        next_month_day = datetime.date(y, m, 1)
-        while d < next_month_day:
-            yield d
-            d += datetime.timedelta(days=1)
-
-    def get_holiday_list(self, theyear):
-        v = []
-        for i in range(self.startmonth, self.startmonth + self.num_month):
-            m = ((i - 1) % 12) + 1
-            for d in self.itermonthdates_just_month(theyear, m):
-                name = self.holidays.get(d)
-                if name:
-                    v.append((d, name))
-        return v
+    def holidays_between(self, start, end):
+        """
+        Yield (date, name) of holidays in start <= date < end in date order.
+        The range may span many years, each year is looked up by its index.
+        """
+        if end <= start:
+            return
+        last_year = (end - datetime.timedelta(days=1)).year
+        for year in range(start.year, last_year + 1):
+            index = self.get_holiday_index(year)
+            lo = index.day_of_year(start) if year == start.year else 0
+            hi = index.day_of_year(end) if year == end.year else None
+            yield from index.items_between(lo, hi)
+
+    def release_holidays(self, year):
+        """
+        Forget the holidays of year, to keep memory bounded over long ranges.
+        They are loaded again when needed.
+        """
+        with self.holiday_lock:
+            self.holiday_indexes.pop(year, None)
+            self.grid_cache.invalidate(lambda key: key[0] == year)
+            for _, provider in self.holiday_providers:
+                provider.years.discard(year)
+                # HolidayBase.pop would populate the year again
+                for d in [d for d in provider if d.year not in provider.years]:
+                    dict.pop(provider, d)
 
-    def formatholidays(self, theyear):
+    def get_date_range(self, theyear, ctx=None):
+        """
+        Return (start, end) dates of the months rendered for theyear,
+        end is the day after the last month.
+        """
+        months = list(self.itermonths(theyear, ctx))
+        y, m = months[0]
+        start = datetime.date(y, m, 1)
+        y, m = months[-1]
+        end = datetime.date(y + m // 12, m % 12 + 1, 1)
+        return start, end
+
+    def get_holiday_list(self, theyear, ctx=None):
+        """
+        Return (date, name) of holidays in the months rendered for theyear.
+        """
+        return list(self.holidays_between(*self.get_date_range(theyear, ctx)))
+
+    def formatholidays(self, theyear, ctx=None):
         v = []
         a = v.append
         a('<table class="%s">\n' % self.cssclass_year)
-        for d, name in self.get_holiday_list(theyear):
+        for d, name in self.get_holiday_list(theyear, ctx):
             a("<tr><td>%s</td><td>%s</td></tr>" % (d, name))
         a("</table>\n")
         return "".join(v)
 
-    def formatyear(self, theyear, width=3):
+    def formatyear(self, theyear, width=3, ctx=None):
         """
         Return a formatted year as a table of tables.
         supports startmonth parameter.
         """
+        return "".join(self.iterformatyear(theyear, width, ctx))
+
+    def iterformatyear(self, theyear, width=3, ctx=None):
+        """
+        Yield a formatted year as fragments, one per month.
+        """
+        width = max(width, 1)
+        if ctx is None:
+            ctx = self.make_context()
+        self.prepare_holidays(theyear, ctx)
+        # vertical space between month
+        # NOTE: 単に <td></td> とすると excel に貼り付けたときに結合セルになってしまうので同じ個数の空セルで埋める。
+        hpad = (
+            '<td class="hpad"><table>'
+            + ('<tr><td class="vfill"></td></tr>' * (2 + 6))
+            + "</table></td>"
+        )
+        # horizontal space between month
+        pad = [
+            "<td><table><tr>" + ('<td class="hfill"></td>' * 7) + "</tr></table></td>",
+            '<td class="vpad"><table><tr><td class="vfill hfill"></td></tr></table></td>',
+        ] * (width - 1)
+        vpad = '\n<tr class="vpad">' + "".join(pad) + "</tr>\n"
+
         v = []
         a = v.append
-        width = max(width, 1)
         a('<table class="%s">' % self.cssclass_year)
         a("\n\n")
         a(
@@ -171,42 +519,28 @@ class HTMLCalendar(calendar.LocaleHTMLCalendar):
             % (width + width - 1, self.cssclass_year_head, theyear)
         )
 
-        for i in range(self.startmonth, self.startmonth + self.num_month, width):
+        rows = range(ctx.startmonth, ctx.startmonth + ctx.num_month, width)
+        for i in rows:
+            if i != rows[0]:
+                a(vpad)
             # months in this row
             a("\n")
             months = [((x - 1) % 12) + 1 for x in range(i, i + width)]
             a('<tr class="months-row">')
-            for m in months:
-                y = theyear + 1 if m < self.startmonth else theyear
-                # save current year and date for test holiday
-                self.cur_year = y
-                self.cur_month = m
+            for j, m in enumerate(months):
+                y = theyear + 1 if m < ctx.startmonth else theyear
+                if j:
+                    a(hpad)
                 a("\n\n")
                 a('<td class="month">')
-                a(self.formatmonth(y, m, withyear=False))
+                a(self.formatmonth(y, m, withyear=False, ctx=ctx))
                 a("</td>")
-                # vertical space between month
-                # NOTE: 単に <td></td> とすると excel に貼り付けたときに結合セルになってしまうので同じ個数の空セルで埋める。
-                a(
-                    '<td class="hpad"><table>'
-                    + ('<tr><td class="vfill"></td></tr>' * (2 + 6))
-                    + "</table></td>"
-                )
-            v.pop()
+                yield "".join(v)
+                v.clear()
             a("</tr>")
 
-            # horizontal space between month
-            pad = [
-                "<td><table><tr>"
-                + ('<td class="hfill"></td>' * 7)
-                + "</tr></table></td>",
-                '<td class="vpad"><table><tr><td class="vfill hfill"></td></tr></table></td>',
-            ] * (width - 1)
-            a('\n<tr class="vpad">' + "".join(pad) + "</tr>\n")
-
-        v.pop()
         a("</table>")
-        return "".join(v)
+        yield "".join(v)
 
     def formatyearpage(
         self,
@@ -217,12 +551,49 @@ class HTMLCalendar(calendar.LocaleHTMLCalendar):
         encoding=None,
         holidays=False,
         calendar=True,
+        ctx=None,
     ):
         """
         Return a formatted year as a complete HTML page.
         """
+        return b"".join(
+            self.iterformatyearpage(
+                theyear,
+                width=width,
+                css=css,
+                css_content=css_content,
+                encoding=encoding,
+                holidays=holidays,
+                calendar=calendar,
+                ctx=ctx,
+            )
+        )
+
+    def writeyearpage(self, fh, theyear, **kwargs):
+        """
+        Write a formatted year page to the binary file object fh.
+        Takes the same keyword arguments as formatyearpage.
+        """
+        for chunk in self.iterformatyearpage(theyear, **kwargs):
+            fh.write(chunk)
+
+    def iterformatyearpage(
+        self,
+        theyear,
+        width=3,
+        css="calendar.css",
+        css_content=None,
+        encoding=None,
+        holidays=False,
+        calendar=True,
+        ctx=None,
+    ):
+        """
+        Yield a formatted year page as encoded chunks, one per month.
+        """
         if encoding is None:
             encoding = sys.getdefaultencoding()
+        encoder = codecs.getincrementalencoder(encoding)("xmlcharrefreplace")
         v = []
         a = v.append
         a('<?xml version="1.0" encoding="%s"?>\n' % encoding)
@@ -247,11 +618,14 @@ class HTMLCalendar(calendar.LocaleHTMLCalendar):
             a("<title>Holidays for %d</title>\n" % theyear)
         a("</head>\n")
         a("<body>\n")
+        yield encoder.encode("".join(v))
+        v.clear()
         if calendar:
-            a(self.formatyear(theyear, width))
+            for fragment in self.iterformatyear(theyear, width, ctx):
+                yield encoder.encode(fragment)
         if holidays:
             a("<p />")
-            a(self.formatholidays(theyear))
+            a(self.formatholidays(theyear, ctx))
         a("</body>\n")
         a("</html>\n")
-        return "".join(v).encode(encoding, "xmlcharrefreplace")
+        yield encoder.encode("".join(v), final=True)
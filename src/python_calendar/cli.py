@@ -2,24 +2,42 @@ import datetime
 import locale
 import os
 import re
-import shutil
-import subprocess
 import sys
-import webbrowser
-from contextlib import contextmanager
+import time
+from contextlib import nullcontext
 from enum import IntEnum, unique
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 from typing import MutableSequence
 from urllib.parse import urlparse
 
 import click
-import pkg_resources
-from inscriptis import get_text
 
+from . import IMPORT_STARTED
+from .cache import RENDER_CACHE_VERSION, DiskCache, get_package_version
 from .calendar import HTMLCalendar
 from .locale_win import normalize_locale_win
-from .util import dot_path
+from .text import TextCalendar
+from .timings import Timings, instrument_calendar
+from .util import dot_path, open_for_write_binary, parse_year_range
+
+IMPORTED = time.perf_counter()
+
+# output formats and whether they are data rather than a calendar page
+OUTPUT_FORMATS = {
+    "html": False,
+    "text": False,
+    "ics": True,
+    "json": True,
+    "ndjson": True,
+}
+
+# output formats implied by the output file suffix
+OUTPUT_SUFFIXES = {
+    ".ics": "ics",
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
 
 
 @unique
@@ -83,35 +101,176 @@ def get_year_month(args, today, maybe_anual):
     return year, month
 
 
-def get_css_stream(style):
-    css_presets = {
-        "default": "styles/calendar.css",
-        "simple": "styles/calendar-simple.css",
-    }
-    css_template = css_presets.get(style or "default")
+CSS_PRESETS = {
+    "default": "styles/calendar.css",
+    "simple": "styles/calendar-simple.css",
+}
+
+
+def get_css_template(style):
+    css_template = CSS_PRESETS.get(style or "default")
     if css_template is None:
         raise ValueError(f"No such style {style}")
-    stream = pkg_resources.resource_stream("python_calendar", css_template)
-    return stream
+    return css_template
 
 
-@contextmanager
-def open_for_write_binary(filename):
-    if filename == "-":
-        yield sys.stdout.buffer
-    else:
-        folder = Path(filename).parent
-        folder.mkdir(parents=True, exist_ok=True)
-        with NamedTemporaryFile(dir=folder, delete=False, mode="w+b") as tmp:
-            yield tmp
-            tmp.close()
-            Path(filename).unlink(missing_ok=True)
-            Path(tmp.name).rename(filename)
+def get_css_path(style):
+    """
+    Return the path of a CSS template, to watch it for changes.
+    """
+    return Path(__file__).parent.joinpath(get_css_template(style))
+
+
+def get_css_stream(style):
+    css_template = get_css_template(style)
+    try:
+        from importlib.resources import files
+    except ImportError:  # Python 3.8
+        return open(Path(__file__).parent.joinpath(css_template), "rb")
+    return files(__package__).joinpath(css_template).open("rb")
+
+
+def negotiate_locale(locale_, encoding, print_error):
+    """
+    Return (LC_TIME locale, output encoding, default encoding of the locale).
+    The process locale is left as it was.
+    """
+    default_locale_candidates = (
+        locale_,
+        os.getenv("LC_ALL"),
+        os.getenv("LC_TIME"),
+        os.getenv("LANG"),
+        ".".join(filter(None, locale.getlocale())),  # Windows: Japanese_Japan.932
+    )
+    default_locale_candidates = [l for l in default_locale_candidates if l is not None]
+    lc_time = next((l for l in default_locale_candidates if l is not None))
+    lc_time_orig = lc_time
+
+    locale_types = [
+        "LC_COLLATE",
+        "LC_CTYPE",
+        "LC_MESSAGES",
+        "LC_MONETARY",
+        "LC_NUMERIC",
+        "LC_TIME",
+    ]
+    locale_save = {}
+
+    # save locales
+    for name in locale_types:
+        try:
+            value = getattr(locale, name)
+        except AttributeError:
+            pass
+        else:
+            # the current setting as is, getlocale() may not be restorable
+            locale_save[name] = locale.setlocale(value)
+
+    # get default encoding by nl_langinfo (Windows is not supported)
+    try:
+        try:
+            locale.setlocale(locale.LC_ALL, lc_time.split(".")[0])
+        except locale.Error as exc:
+            # setlocale(locale.LC_ALL, "en_US") -> unsupported locale setting
+            pass
+        try:
+            default_encoding = locale.nl_langinfo(locale.CODESET)
+        except AttributeError:
+            # Windows
+            default_encoding = locale.getpreferredencoding()
+            if "." in default_encoding:
+                default_encoding = lc_time.split(".")[1]
+    finally:
+        locale.setlocale(locale.LC_ALL, "")
+        for name in locale_save:
+            locale.setlocale(getattr(locale, name), locale_save[name])
+
+    if encoding is None:
+        if "." in lc_time:
+            encoding = lc_time.split(".")[1]
+        else:
+            temp = next((l for l in default_locale_candidates if "." in l), None)
+            if temp:
+                encoding = temp.split(".")[1]
+            else:
+                encoding = default_encoding
+
+    try:
+        try_lc_time = lc_time.split(".")[0] + "." + default_encoding
+        locale.setlocale(locale.LC_TIME, try_lc_time)
+        lc_time = try_lc_time
+    except locale.Error as exc:
+        try:
+            locale.setlocale(locale.LC_TIME, lc_time)
+        except:
+            print_error(f"Bad locale {lc_time_orig}: {exc}")
+            print_error("Please check available locale on your system.")
+            sys.exit(1)
+    finally:
+        for name in locale_save:
+            locale.setlocale(getattr(locale, name), locale_save[name])
+
+    return lc_time, encoding, default_encoding
+
+
+class DefaultCommandGroup(click.Group):
+    """
+    Command group that runs default_command unless a sub command is given.
+    """
+
+    def __init__(self, *args, default_command=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        # "pycal --help" lists the commands, "pycal -t --help" shows the
+        # options of the default command
+        if not args or (
+            args[0] not in self.commands and args[0] not in ctx.help_option_names
+        ):
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+
+def split_codes(ctx, param, value):
+    if value is None:
+        return []
+    return [code.strip() for code in value.split(",") if code.strip()]
+
+
+def validate_year_range(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_year_range(value)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc))
+
+
+@click.group(cls=DefaultCommandGroup, default_command="calendar")
+def main():
+    """
+    Holiday calendar utility with HTML output.
+    The calendar command runs when no command is given.
+    """
 
 
-@click.command(context_settings={"show_default": True})
+@main.command("calendar", context_settings={"show_default": True})
 @click.option("--text", "-t", "text_mode", is_flag=True, help="Text mode")
 @click.option("--html", "-H", "html_mode", is_flag=True, help="HTML mode")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(list(OUTPUT_FORMATS), case_sensitive=False),
+    default=None,
+    help="Output format, ics is an iCalendar feed of holidays.  [default: html or text]",
+)
+@click.option(
+    "--years",
+    default=None,
+    callback=validate_year_range,
+    help="Range of years (ics, json, ndjson). eg. 1950-2100",
+)
 @click.option(
     "--width",
     "-w",
@@ -149,6 +308,11 @@ def open_for_write_binary(filename):
     default=None,
     help="CSS location or URL.",
 )
+@click.option(
+    "--css-asset",
+    is_flag=True,
+    help="Link a minified stylesheet named by its content hash. eg. calendar.3f2a9c1d.css (from --css or --style)",
+)
 @click.option(
     "--style",
     "-s",
@@ -162,10 +326,12 @@ def open_for_write_binary(filename):
     "--country",
     "-C",
     default=None,
-    help="Country code for holidays. eg. US (default is same as locale)",
+    help="Country codes for holidays. eg. US or US,JP,DE-BY (default is same as locale)",
 )
 @click.option("--subdiv", default=None, help="Specify subdivision.")
-@click.option("--financial", default=None, help="Use financial holiday.")
+@click.option(
+    "--financial", default=None, help="Use financial holiday. eg. NYSE or NYSE,ECB"
+)
 @click.option("--force", "-f", is_flag=True, help="Force overwrite css file.")
 @click.option("--quiet", "-q", is_flag=True, help="Quiet mode.")
 @click.option(
@@ -174,7 +340,22 @@ def open_for_write_binary(filename):
 @click.option(
     "--color", "-c", is_flag=True, default=None, help="color mode (text mode)."
 )
+@click.option("--no-cache", is_flag=True, help="Do not use the render cache.")
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="Keep running, write again when the date or the CSS template changes.",
+)
 @click.option("--verbose", "-v", is_flag=True, help="Show information.")
+@click.option(
+    "--timings", "show_timings", is_flag=True, help="Show wall time of each phase."
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write cProfile stats to the file.",
+)
 @click.argument(
     "args",
     # type=click.IntRange(1949, 3000),
@@ -182,9 +363,11 @@ def open_for_write_binary(filename):
     nargs=-1,
     required=False,
 )
-def main(
+def calendar(
     text_mode,
     html_mode,
+    output_format,
+    years,
     width,
     start_month,
     first_weekday,
@@ -196,6 +379,7 @@ def main(
     list_holidays,
     css,
     use_external_css,
+    css_asset,
     css_href,
     style,
     encoding,
@@ -203,10 +387,43 @@ def main(
     force,
     no_browser,
     color,
+    no_cache,
+    watch,
     verbose,
+    show_timings,
+    profile,
     quiet,
     args,
 ):
+    """
+    Show or write a calendar. This is the default command.
+    """
+    timings = Timings()
+    timings.add("imports", IMPORTED - IMPORT_STARTED)
+    click_ctx = click.get_current_context()
+
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+        def dump_profile():
+            profiler.disable()
+            profiler.dump_stats(profile)
+
+        click_ctx.call_on_close(dump_profile)
+        profiler.enable()
+
+    if show_timings:
+
+        def report_timings():
+            # reported on exit too, to see where a failing run spent its time
+            total = time.perf_counter() - IMPORT_STARTED
+            for line in timings.format(total):
+                print(line, file=sys.stderr)
+
+        click_ctx.call_on_close(report_timings)
+
     def print_error(message):
         if not quiet:
             print(message, file=sys.stderr)
@@ -217,7 +434,8 @@ def main(
         print_error("Usage: pycal [OPTIONS] [YEAR] [MONTH]")
         sys.exit(1)
 
-    year, month = get_year_month(args, today, maybe_anual=(width or start_month))
+    maybe_anual = width or start_month
+    year, month = get_year_month(args, today, maybe_anual)
 
     if width is None:
         width = 3
@@ -231,11 +449,30 @@ def main(
     if css_href:
         use_external_css = True
 
-    if not html_mode and not text_mode:
+    if css_asset and use_external_css:
+        print_error("Can not use --css-asset with --use-external-css or --css-href.")
+        sys.exit(1)
+
+    if output_format is None and output:
+        output_format = OUTPUT_SUFFIXES.get(Path(output).suffix.lower())
+    if output_format == "text":
+        text_mode = True
+    elif output_format == "html":
+        html_mode = True
+    data_mode = OUTPUT_FORMATS.get(output_format, False)
+
+    if years is not None and not data_mode:
+        print_error("--years option is only for ics, json and ndjson formats.")
+        sys.exit(1)
+
+    if data_mode:
+        text_mode = False
+    elif not html_mode and not text_mode:
         if (
             css_href
             or css
             or use_external_css
+            or css_asset
             or (
                 output is not None
                 and re.match(r"\.(html|htm|xml)", str(Path(output).suffix), re.I)
@@ -244,7 +481,7 @@ def main(
             text_mode = False
         else:
             text_mode = True
-    html_mode = not text_mode
+    html_mode = not text_mode and not data_mode
 
     if html_mode:
         if output is None:
@@ -277,100 +514,42 @@ def main(
     if output == "-":
         no_browser = True
 
+    if css_asset and (not html_mode or output == "-"):
+        print_error("warning: --css-asset option is only for HTML output files.")
+        css_asset = False
+
+    if watch:
+        if data_mode or output == "-":
+            print_error("--watch option needs an output file of html or text.")
+            sys.exit(1)
+        # the calendar is kept to render again
+        no_cache = True
+
     if color is None:
         color = sys.stdout.isatty()
     else:
         if color and text_mode is None:
             text_mode = True
 
-    default_locale_candidates = (
-        locale_,
-        os.getenv("LC_ALL"),
-        os.getenv("LC_TIME"),
-        os.getenv("LANG"),
-        ".".join(locale.getlocale()),  # Windows: Japanese_Japan.932
-    )
-    default_locale_candidates = [l for l in default_locale_candidates if l is not None]
-    lc_time = next((l for l in default_locale_candidates if l is not None))
-    lc_time_orig = lc_time
-
-    locale_types = [
-        "LC_COLLATE",
-        "LC_CTYPE",
-        "LC_MESSAGES",
-        "LC_MONETARY",
-        "LC_NUMERIC",
-        "LC_TIME",
-    ]
-    locale_save = {}
-
-    # save locales
-    for name in locale_types:
-        try:
-            value = getattr(locale, name)
-        except AttributeError:
-            pass
-        else:
-            locale_save[name] = locale.getlocale(value)
+    with timings.phase("locale"):
+        lc_time, encoding, default_encoding = negotiate_locale(
+            locale_, encoding, print_error
+        )
 
-    # get default encoding by nl_langinfo (Windows is not supported)
-    try:
-        try:
-            locale.setlocale(locale.LC_ALL, lc_time.split(".")[0])
-        except locale.Error as exc:
-            # setlocale(locale.LC_ALL, "en_US") -> unsupported locale setting
-            pass
-        try:
-            default_encoding = locale.nl_langinfo(locale.CODESET)
-        except AttributeError:
-            # Windows
-            default_encoding = locale.getpreferredencoding()
-            if '.' in default_encoding:
-                default_encoding = lc_time.split(".")[1]
-    finally:
-        locale.setlocale(locale.LC_ALL, "")
-        for name in locale_save:
-            locale.setlocale(getattr(locale, name), locale_save[name])
+        # 'Japanese_Japan.utf8' -> 'ja_JP'
+        norm_lc = normalize_locale_win(lc_time)
 
-    if encoding is None:
-        if "." in lc_time:
-            encoding = lc_time.split(".")[1]
-        else:
-            temp = next((l for l in default_locale_candidates if "." in l), None)
-            if temp:
-                encoding = temp.split(".")[1]
+        # Detect country from locale string
+        if financial is None and country is None:
+            match = re.match("^[a-z]{2}_([a-z]{2})", norm_lc, re.I)
+            if match:
+                country = match.group(1)
+                if not quiet:
+                    print_error(f"Holiday region is {country}.")
             else:
-                encoding = default_encoding
-
-    try:
-        try_lc_time = lc_time.split(".")[0] + "." + default_encoding
-        locale.setlocale(locale.LC_TIME, try_lc_time)
-        lc_time = try_lc_time
-    except locale.Error as exc:
-        try:
-            locale.setlocale(locale.LC_TIME, lc_time)
-        except:
-            print_error(f"Bad locale {lc_time_orig}: {exc}")
-            print_error("Please check available locale on your system.")
-            sys.exit(1)
-    finally:
-        for name in locale_save:
-            locale.setlocale(getattr(locale, name), locale_save[name])
-
-    # 'Japanese_Japan.utf8' -> 'ja_JP'
-    norm_lc = normalize_locale_win(lc_time)
-
-    # Detect country from locale string
-    if financial is None and country is None:
-        match = re.match("^[a-z]{2}_([a-z]{2})", norm_lc, re.I)
-        if match:
-            country = match.group(1)
-            if not quiet:
-                print_error(f"Holiday region is {country}.")
-        else:
-            print_error(f"warning: Can not detect coutry from locale {lc_time}")
-            print_error("Plase use --country option.")
-            sys.exit(1)
+                print_error(f"warning: Can not detect coutry from locale {lc_time}")
+                print_error("Plase use --country option.")
+                sys.exit(1)
 
     # when output filename is calendar.html.
     #   --css      --css_href
@@ -420,13 +599,11 @@ def main(
                     css_href = os.path.relpath(css_file, Path(output).parent)
                 css_href = dot_path(css_href)
 
+    first_month = start_month
     start_month = month if month else start_month
     num_month = 12 if month is None else 1
     width = width if month is None else 1
 
-    elinks = shutil.which("elinks")
-    w3m = shutil.which("w3m")
-
     if verbose:
         print_error(f"text: {text_mode}")
         print_error(f"year: {year}")
@@ -445,69 +622,74 @@ def main(
         print_error(f"encoding: {encoding}")
         print_error(f"default_encoding: {default_encoding}")
         print_error(f"color: {color}")
-        print_error(f"elinks: {elinks}")
-        print_error(f"w3m: {w3m}")
 
     # read or write css file
     css_content = None
+    css_written = False
+    css_source = None
+    with timings.phase("css"):
+        if css_asset:
+            from .assets import write_css_asset
+
+            # a custom --css file or the style template
+            css_source = Path(css) if css else get_css_path(style)
+
+            def write_asset():
+                if css:
+                    content = css_source.read_text(encoding="utf-8")
+                else:
+                    with get_css_stream(style) as stream:
+                        content = stream.read().decode("utf-8")
+                return write_css_asset(Path(output).parent, content, css_source.stem)
 
-    if not use_external_css:
-        stream = None
-        if css_file:
             try:
-                stream = open(css_file, "r")
+                css_href = write_asset()
             except FileNotFoundError:
-                print_error(f"No such CSS file: {css_file}")
+                print_error(f"No such CSS file: {css}")
                 sys.exit(1)
-            css_content = stream.read()
-        else:
-            try:
-                stream = get_css_stream(style or "default")
             except ValueError as exc:
                 print_error(str(exc))
                 sys.exit(1)
-            css_content = stream.read().decode("utf-8")
-    else:
-        if css_file is not None:
-            if force or not os.path.exists(css_file):
-                Path(css_file).parent.mkdir(parents=True, exist_ok=True)
-                with open(css_file, "wb") as out:
-                    try:
-                        with get_css_stream(style or "default") as stream:
-                            template = stream.read()
-                    except ValueError as exc:
-                        print_error(str(exc))
-                        sys.exit(1)
-                    out.write(template)
+        elif not use_external_css:
+            stream = None
+            if css_file:
+                try:
+                    stream = open(css_file, "r")
+                except FileNotFoundError:
+                    print_error(f"No such CSS file: {css_file}")
+                    sys.exit(1)
+                css_content = stream.read()
             else:
-                print_error(f"{css_file} exists. add --force option to overwrite css.")
+                try:
+                    stream = get_css_stream(style or "default")
+                except ValueError as exc:
+                    print_error(str(exc))
+                    sys.exit(1)
+                css_content = stream.read().decode("utf-8")
+        else:
+            if css_file is not None:
+                if force or not os.path.exists(css_file):
+                    Path(css_file).parent.mkdir(parents=True, exist_ok=True)
+                    with open(css_file, "wb") as out:
+                        try:
+                            with get_css_stream(style or "default") as stream:
+                                template = stream.read()
+                        except ValueError as exc:
+                            print_error(str(exc))
+                            sys.exit(1)
+                        out.write(template)
+                    css_written = True
+                else:
+                    print_error(
+                        f"{css_file} exists. add --force option to overwrite css."
+                    )
 
-    visible_holiday = False
-    visible_today = False
+    # text mode marks holidays and today by ANSI colors or by brackets
+    visible_holiday = text_mode and not color
+    visible_today = text_mode and not color
     inline_style = False
 
-    if text_mode:
-        if color and elinks:
-            inline_style = True
-        else:
-            visible_holiday = True
-            visible_today = True
-
-    cal = HTMLCalendar(
-        firstweekday=Weekday[first_weekday],
-        locale=lc_time,
-        startmonth=start_month,
-        country=country,
-        financial=financial,
-        subdiv=subdiv,
-        num_month=num_month,
-        visible_holiday=visible_holiday,
-        visible_today=visible_today,
-        inline_style=inline_style,
-        today=today,
-    )
-    formatyearpage = lambda: cal.formatyearpage(
-        year,
+    page_options = dict(
         width=width,
         css=css_href,
         css_content=css_content,
@@ -515,42 +697,507 @@ def main(
         holidays=holidays,
         calendar=(not list_holidays),
     )
-    try:
-        content = formatyearpage()
-    except NotImplementedError:
-        if month:
-            print_error("Can not create calendar for year {year}/{month}.")
-        else:
-            print_error("Can not create calendar for year {year}.")
-        sys.exit(1)
 
-    if text_mode:
-        if elinks or w3m:
-            if elinks:
-                args = [elinks, "-dump", "-dump-color-mode", "1"]
+    content = None
+    render_cache = None
+    cache_key = None
+    if not no_cache:
+        render_cache = DiskCache(Path.home().joinpath(".cache", "pycal", "render"))
+        cache_key = render_cache.make_key(
+            cache_version=RENDER_CACHE_VERSION,
+            python_calendar=get_package_version("python-calendar"),
+            holidays_version=get_package_version("holidays"),
+            today=today.isoformat(),
+            text_mode=text_mode,
+            output_format=output_format,
+            years=years and (years.start, years.stop),
+            year=year,
+            start_month=start_month,
+            num_month=num_month,
+            first_weekday=first_weekday,
+            locale=lc_time,
+            country=country,
+            subdiv=subdiv,
+            financial=financial,
+            visible_holiday=visible_holiday,
+            visible_today=visible_today,
+            inline_style=inline_style,
+            color=text_mode and color,
+            **page_options,
+        )
+        with timings.phase("render cache"):
+            content = render_cache.get(cache_key)
+        timings.count("render cache %s" % ("hits" if content is not None else "misses"))
+        if verbose:
+            print_error(f"render cache: {'hit' if content is not None else 'miss'}")
+
+    if content is not None:
+        with timings.phase("write"), open_for_write_binary(output) as fh:
+            fh.write(content)
+    else:
+        calendar_options = dict(
+            firstweekday=Weekday[first_weekday],
+            locale=lc_time,
+            startmonth=start_month,
+            country=country,
+            financial=financial,
+            subdiv=subdiv,
+            num_month=num_month,
+            visible_holiday=visible_holiday,
+            visible_today=visible_today,
+            inline_style=inline_style,
+            today=today,
+            # months not containing today are not rendered again by --watch
+            month_cache_size=24 if watch else 0,
+        )
+        with timings.phase("holidays"):
+            try:
+                if text_mode:
+                    cal = TextCalendar(color=color, **calendar_options)
+                else:
+                    cal = HTMLCalendar(**calendar_options)
+            except (NotImplementedError, ValueError) as exc:
+                print_error(str(exc))
+                sys.exit(1)
+            if show_timings:
+                instrument_calendar(cal, timings)
+            if not data_mode:
+                cal.prepare_holidays(year)
+        # stream the page month by month into the output and the cache
+        cache_writer = (
+            render_cache.open_for_write(cache_key) if render_cache else nullcontext()
+        )
+        if output_format == "ics":
+            from .export import iterformatics
+
+            if years is None:
+                start, end = cal.get_date_range(year)
             else:
-                print_error("warning: elinks is not installed.")
-                args = ["w3m", "-T", "text/html", "-dump", "-O", "utf-8"]
-            proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-            content = proc.communicate(content)[0].decode("utf-8")
-            content = (
-                "\n".join([l for l in content.split("\n") if l != ""]).encode(encoding)
-                + b"\n"
+                start = datetime.date(years.start, 1, 1)
+                end = datetime.date(years.stop, 1, 1)
+            chunks = iterformatics(
+                cal, start, end, version=get_package_version("python-calendar")
+            )
+        elif output_format in ("json", "ndjson"):
+            from .export import iterformatjson
+
+            chunks = iterformatjson(
+                cal,
+                year,
+                years,
+                calendar=not list_holidays,
+                holidays=holidays,
+                ndjson=output_format == "ndjson",
             )
         else:
-            print_error("warning: elinks or w3m is not installed.")
-            content = get_text(content.decode(encoding)).encode(encoding)
+            chunks = cal.iterformatyearpage(year, **page_options)
+        try:
+            with timings.phase("write"), open_for_write_binary(
+                output
+            ) as fh, cache_writer as cache_fh:
+                # rendering time is taken out of the write phase
+                phase = "render %s" % (
+                    output_format or ("text" if text_mode else "html")
+                )
+                for chunk in timings.iter_timed(phase, chunks):
+                    fh.write(chunk)
+                    if cache_fh:
+                        cache_fh.write(chunk)
+        except NotImplementedError:
+            if years is not None:
+                print_error(
+                    f"Can not create holidays for years {years.start}-{years.stop - 1}."
+                )
+            elif month:
+                print_error(f"Can not create calendar for year {year}/{month}.")
+            else:
+                print_error(f"Can not create calendar for year {year}.")
+            sys.exit(1)
 
-    # write html file
-    if output is not None:
-        with open_for_write_binary(output) as fh:
-            fh.write(content)
-        if not quiet and no_browser and output != "-":
-            print_error(f"Wrote {output}")
+    if not quiet and no_browser and output != "-":
+        print_error(f"Wrote {output}")
+
+    if html_mode and not no_browser:
+        import webbrowser
 
-    if not text_mode and not no_browser:
         webbrowser.open(output)
 
+    if watch:
+        from .watch import watch as watch_changes
+
+        css_template = css_source or get_css_path(style)
+        watched = []
+        if html_mode and (css_asset or css_written or not use_external_css):
+            watched.append(css_template)
+        rendered_day = [today]
+
+        def on_change(day, changed):
+            if css_template in changed:
+                if css_asset:
+                    # a new name, so that the page links the new content
+                    page_options["css"] = write_asset()
+                elif css_written:
+                    # the page links the stylesheet, write the stylesheet only
+                    with get_css_stream(style) as stream, open_for_write_binary(
+                        css_file
+                    ) as fh:
+                        fh.write(stream.read())
+                    print_error(f"Wrote {css_file}")
+                    if day == rendered_day[0]:
+                        return
+                else:
+                    with get_css_stream(style) as stream:
+                        page_options["css_content"] = stream.read().decode("utf-8")
+            rendered_day[0] = day
+            # the year or month shown may follow the date, months of the
+            # month cache are reused
+            y, m = get_year_month(args, day, maybe_anual)
+            ctx = cal.make_context(
+                startmonth=m or first_month, num_month=1 if m else 12, today=day
+            )
+            with open_for_write_binary(output) as fh:
+                for chunk in cal.iterformatyearpage(y, ctx=ctx, **page_options):
+                    fh.write(chunk)
+            print_error(f"Wrote {output}")
+
+        try:
+            watch_changes(on_change, watched)
+        except KeyboardInterrupt:
+            pass
+
+
+@main.command(context_settings={"show_default": True})
+@click.option("--host", default="127.0.0.1", help="Address to listen on.")
+@click.option("--port", "-p", type=int, default=8000, help="Port to listen on.")
+@click.option(
+    "--workers",
+    type=click.IntRange(1),
+    default=8,
+    help="Maximum number of concurrent renders.",
+)
+@click.option(
+    "--first-weekday",
+    "-d",
+    type=click.Choice(list(Weekday.__members__)),
+    default="sun",
+    help="First weekday.",
+)
+@click.option("--locale", "locale_", default=None, help="Locale eg. en_US.UTF-8.")
+@click.option(
+    "--width",
+    "-w",
+    type=click.IntRange(1, 12, clamp=True),
+    default=3,
+    help="Width of columns.",
+)
+@click.option(
+    "--style",
+    "-s",
+    type=click.Choice(["default", "simple"], case_sensitive=False),
+    default="default",
+    help="CSS template name.",
+)
+@click.option("--quiet", "-q", is_flag=True, help="Quiet mode.")
+def serve(host, port, workers, first_weekday, locale_, width, style, quiet):
+    """
+    Serve calendars over HTTP.
+
+    \b
+    /COUNTRY/YEAR           anual calendar
+    /COUNTRY/YEAR/MONTH     calendar for a month
+    /COUNTRY/YEAR/holidays  holiday list
+    COUNTRY may be a financial market (eg. NYSE). Use ?subdiv=XX for subdivisions.
+    """
+    from .server import serve as run_server
+
+    with get_css_stream(style) as stream:
+        css_content = stream.read().decode("utf-8")
+    run_server(
+        host=host,
+        port=port,
+        max_workers=workers,
+        firstweekday=Weekday[first_weekday],
+        locale=locale_,
+        width=width,
+        css_content=css_content,
+        quiet=quiet,
+    )
+
+
+@main.command(context_settings={"show_default": True})
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option(
+    "--country",
+    "-C",
+    "codes",
+    required=True,
+    callback=split_codes,
+    help="Countries or financial markets separated by commas. eg. US,JP,NYSE",
+)
+@click.option(
+    "--subdiv",
+    "subdivs",
+    default=None,
+    callback=split_codes,
+    help="Subdivisions separated by commas, rendered for countries having them.",
+)
+@click.option(
+    "--years",
+    default=str(datetime.date.today().year),
+    callback=validate_year_range,
+    help="Range of years. eg. 2000-2030",
+)
+@click.option(
+    "--style",
+    "-s",
+    "styles",
+    default="default",
+    callback=split_codes,
+    help="CSS template names separated by commas. eg. default,simple",
+)
+@click.option(
+    "--first-weekday",
+    "-d",
+    type=click.Choice(list(Weekday.__members__)),
+    default="sun",
+    help="First weekday.",
+)
+@click.option("--locale", "locale_", default=None, help="Locale eg. en_US.UTF-8.")
+@click.option(
+    "--width",
+    "-w",
+    type=click.IntRange(1, 12, clamp=True),
+    default=3,
+    help="Width of columns.",
+)
+@click.option("--holidays", "-h", is_flag=True, help="Include holiday list.")
+@click.option("--mark-today", is_flag=True, help="Mark today as [1].")
+@click.option(
+    "--workers", type=click.IntRange(1), default=None, help="Worker processes."
+)
+@click.option("--force", "-f", is_flag=True, help="Rebuild every page.")
+@click.option(
+    "--css-asset",
+    is_flag=True,
+    help="Link minified stylesheets assets/STYLE.HASH.css instead of inlining them.",
+)
+@click.option("--quiet", "-q", is_flag=True, help="Quiet mode.")
+def site(
+    output_dir,
+    codes,
+    subdivs,
+    years,
+    styles,
+    first_weekday,
+    locale_,
+    width,
+    holidays,
+    mark_today,
+    workers,
+    force,
+    css_asset,
+    quiet,
+):
+    """
+    Write calendar pages STYLE/CODE/YEAR.html with index pages.
+
+    Pages whose inputs did not change since the last run are not rendered
+    again, see manifest.json in OUTPUT_DIR.
+    """
+    from .sitegen import build_site, expand_codes
+
+    def print_error(message):
+        if not quiet:
+            print(message, file=sys.stderr)
+
+    lc_time, _, _ = negotiate_locale(locale_, None, print_error)
+
+    css = {}
+    for style in styles:
+        try:
+            with get_css_stream(style) as stream:
+                css[style] = stream.read().decode("utf-8")
+        except ValueError as exc:
+            print_error(str(exc))
+            sys.exit(1)
+
+    try:
+        rendered, skipped = build_site(
+            output_dir,
+            expand_codes(codes, subdivs),
+            years,
+            css,
+            firstweekday=Weekday[first_weekday],
+            locale=lc_time,
+            width=width,
+            holidays=holidays,
+            visible_today=mark_today,
+            max_workers=workers,
+            force=force,
+            css_assets=css_asset,
+            log=None if quiet else print_error,
+        )
+    except (NotImplementedError, ValueError) as exc:
+        print_error(str(exc))
+        sys.exit(1)
+    print_error(f"{rendered} pages rendered, {skipped} pages unchanged.")
+
+
+def parse_dates(values):
+    """
+    Return dates of ISO format values, or of lines of stdin if there are none.
+    """
+    if not values:
+        values = [line for line in (x.strip() for x in sys.stdin) if line]
+    dates = []
+    for value in values:
+        try:
+            dates.append(datetime.date.fromisoformat(value))
+        except ValueError:
+            raise click.BadParameter(f"invalid date: {value}")
+    return dates
+
+
+def get_business_calendar(click_ctx, dates, n=0):
+    from .bizday import BusinessCalendar, years_around
+
+    options = click_ctx.obj
+    if options["country"] is None and options["financial"] is None:
+        raise click.UsageError("Please use --country or --financial option.")
+    years = options["years"]
+    if years is None and dates:
+        years = years_around(dates, n, options["weekend"])
+    try:
+        return BusinessCalendar(
+            country=options["country"],
+            financial=options["financial"],
+            subdiv=options["subdiv"],
+            years=years,
+            weekend=options["weekend"],
+        )
+    except (NotImplementedError, ValueError) as exc:
+        raise click.UsageError(str(exc))
+
+
+@main.group(context_settings={"show_default": True})
+@click.option(
+    "--country",
+    "-C",
+    default=None,
+    help="Country codes for holidays. eg. US or US,JP,DE-BY",
+)
+@click.option("--subdiv", default=None, help="Specify subdivision.")
+@click.option(
+    "--financial", default=None, help="Use financial holiday. eg. NYSE or NYSE,ECB"
+)
+@click.option(
+    "--weekend",
+    default="sat,sun",
+    help="Weekend days separated by commas, or a mask from monday. eg. 0000011",
+)
+@click.option(
+    "--years",
+    default=None,
+    callback=validate_year_range,
+    help="Range of years of business days.  [default: around the dates]",
+)
+@click.pass_context
+def bizday(click_ctx, country, subdiv, financial, weekend, years):
+    """
+    Business days of holidays, for settlement dates.
+
+    Dates are YYYY-MM-DD, read from stdin one per line if none is given.
+    """
+    from .bizday import parse_weekend
+
+    try:
+        parse_weekend(weekend)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--weekend")
+    click_ctx.obj = dict(
+        country=country,
+        subdiv=subdiv,
+        financial=financial,
+        weekend=weekend,
+        years=years,
+    )
+
+
+@bizday.command("check")
+@click.argument("dates", nargs=-1)
+@click.pass_context
+def bizday_check(click_ctx, dates):
+    """
+    Show whether dates are business days, exit with 1 if any is not.
+    """
+    dates = parse_dates(dates)
+    cal = get_business_calendar(click_ctx, dates)
+    try:
+        results = cal.is_business_day_batch(dates)
+    except ValueError as exc:
+        raise click.UsageError(str(exc))
+    ok = True
+    for date, business in zip(dates, results):
+        if business:
+            print(f"{date}\tbusiness day")
+            continue
+        ok = False
+        name = cal.get_holiday(date)
+        if name is None:
+            print(f"{date}\tweekend")
+        else:
+            print(f"{date}\tholiday\t{name}")
+    sys.exit(0 if ok else 1)
+
+
+@bizday.command("add")
+@click.option(
+    "--days",
+    "-n",
+    type=int,
+    required=True,
+    help="Business days to add, negative to go back.",
+)
+@click.argument("dates", nargs=-1)
+@click.pass_context
+def bizday_add(click_ctx, days, dates):
+    """
+    Show the business day DAYS business days after each date.
+
+    With 0, a date that is not a business day rolls to the next one.
+    """
+    dates = parse_dates(dates)
+    cal = get_business_calendar(click_ctx, dates, days)
+    try:
+        results = cal.add_business_days_batch(dates, days)
+    except ValueError as exc:
+        raise click.UsageError(str(exc))
+    for date in results:
+        print(date)
+
+
+@bizday.command("between")
+@click.argument("dates", nargs=-1)
+@click.pass_context
+def bizday_between(click_ctx, dates):
+    """
+    Show the number of business days from START to END, END excluded.
+
+    DATES are START END pairs, or lines of "START END" of stdin.
+    """
+    if not dates:
+        dates = [x for line in sys.stdin for x in line.split()]
+    dates = parse_dates(dates)
+    if len(dates) % 2:
+        raise click.BadParameter("dates must be START END pairs")
+    cal = get_business_calendar(click_ctx, dates)
+    try:
+        results = cal.business_days_between_batch(dates[::2], dates[1::2])
+    except ValueError as exc:
+        raise click.UsageError(str(exc))
+    for result in results:
+        print(result)
+
 
 if __name__ == "__main__":
     main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,239 @@
+import datetime
+import json
+import re
+
+# events or records of an encoded chunk
+CHUNK_RECORDS = 64
+
+ICS_LINE_OCTETS = 75
+
+
+def ics_escape(text):
+    """
+    Escape a TEXT value of iCalendar.
+    """
+    text = text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return re.sub(r"\r\n|\r|\n", "\\\\n", text)
+
+
+def ics_fold(line):
+    """
+    Fold a content line into lines of at most 75 octets, joined by CRLF.
+    """
+    data = line.encode("utf-8")
+    if len(data) <= ICS_LINE_OCTETS:
+        return line + "\r\n"
+    v = []
+    limit = ICS_LINE_OCTETS
+    while data:
+        i = min(limit, len(data))
+        # do not split a multibyte character
+        while i < len(data) and data[i] & 0xC0 == 0x80:
+            i -= 1
+        v.append(data[:i].decode("utf-8"))
+        data = data[i:]
+        # continuation lines start with a space
+        limit = ICS_LINE_OCTETS - 1
+    return "\r\n ".join(v) + "\r\n"
+
+
+def source_slug(cal):
+    """
+    Return a stable name of the holiday sources of cal. eg. "us-ca.nyse"
+    """
+    return ".".join(
+        "-".join(x for x in (code, subdiv) if x).lower()
+        for _, code, subdiv in cal.holiday_source
+    )
+
+
+def format_event(cal_slug, day, name):
+    """
+    Return a VEVENT of an all day holiday.
+    """
+    stamp = day.strftime("%Y%m%d")
+    end = (day + datetime.timedelta(days=1)).strftime("%Y%m%d")
+    # the uid and dtstamp only depend on the date and the sources,
+    # so that feeds of the same holidays are identical
+    return "".join(
+        ics_fold(line)
+        for line in (
+            "BEGIN:VEVENT",
+            "UID:%s-%s@python-calendar" % (stamp, cal_slug),
+            "DTSTAMP:%sT000000Z" % stamp,
+            "DTSTART;VALUE=DATE:%s" % stamp,
+            "DTEND;VALUE=DATE:%s" % end,
+            "SUMMARY:%s" % ics_escape(name),
+            "TRANSP:TRANSPARENT",
+            "END:VEVENT",
+        )
+    )
+
+
+def iterformatics(cal, start, end, encoding="utf-8", version=None):
+    """
+    Yield holidays of cal in start <= date < end as encoded chunks of an
+    iCalendar feed.
+
+    Holidays are loaded one year at a time and released after, so memory
+    does not grow with the range.
+    """
+    slug = source_slug(cal)
+    product = " ".join(filter(None, ["pycal", version]))
+    header = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//python-calendar//%s//EN" % product,
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:%s" % ics_escape("Holidays %s" % slug.upper()),
+    ]
+    yield "".join(ics_fold(line) for line in header).encode(encoding)
+
+    # years already loaded by the caller are kept
+    loaded = set(cal.holiday_indexes)
+    v = []
+    for year in range(start.year, end.year + 1):
+        lo = max(start, datetime.date(year, 1, 1))
+        if year < datetime.MAXYEAR:
+            hi = min(end, datetime.date(year + 1, 1, 1))
+        else:
+            hi = end
+        if lo >= hi:
+            break
+        for day, name in cal.holidays_between(lo, hi):
+            v.append(format_event(slug, day, name))
+            if len(v) >= CHUNK_RECORDS:
+                yield "".join(v).encode(encoding)
+                v = []
+        if year not in loaded:
+            cal.release_holidays(year)
+    v.append(ics_fold("END:VCALENDAR"))
+    yield "".join(v).encode(encoding)
+
+
+def iter_segments(cal, year=None, years=None, ctx=None):
+    """
+    Yield ([(year, month), ...], (start, end)) of the months and holidays to
+    export: the months rendered for year, or every month of years.
+    """
+    if years is None:
+        yield list(cal.itermonths(year, ctx)), cal.get_date_range(year, ctx)
+        return
+    for y in years:
+        months = [(y, m) for m in range(1, 13)]
+        yield months, (datetime.date(y, 1, 1), datetime.date(y + 1, 1, 1))
+
+
+def calendar_record(cal, ctx):
+    return {
+        "type": "calendar",
+        "firstweekday": cal.firstweekday,
+        "today": ctx.today.isoformat(),
+        "sources": [
+            {"kind": kind, "code": code, "subdiv": subdiv}
+            for kind, code, subdiv in cal.holiday_source
+        ],
+    }
+
+
+def month_record(cal, year, month, ctx):
+    """
+    Return a month as a dict of weeks of day cells, None outside the month.
+    Weekdays are 0 (monday) to 6.
+    """
+    ctx = cal.make_month_context(year, month, ctx)
+    labels = [label for label, _ in cal.holiday_providers]
+    weeks = []
+    for week in cal.month_weeks(year, month, ctx):
+        if not any(cell[0] for cell in week):
+            # padding of month_weeks
+            continue
+        cells = []
+        for day, weekday, mask, today in week:
+            if day == 0:
+                cells.append(None)
+                continue
+            cell = {
+                "date": "%04d-%02d-%02d" % (year, month, day),
+                "day": day,
+                "weekday": weekday,
+                "holiday": ctx.holidays.get(month, day) if mask else None,
+                "today": today,
+            }
+            if labels[0] is not None:
+                cell["sources"] = [x for i, x in enumerate(labels) if mask >> i & 1]
+            cells.append(cell)
+        weeks.append(cells)
+    return {
+        "type": "month",
+        "year": year,
+        "month": month,
+        "name": cal.locale_names.month_name[month],
+        "weeks": weeks,
+    }
+
+
+def holiday_record(day, name):
+    return {"type": "holiday", "date": day.isoformat(), "name": name}
+
+
+def iterformatjson(
+    cal, year=None, years=None, calendar=True, holidays=False, ndjson=False, ctx=None
+):
+    """
+    Yield months and holidays as UTF-8 encoded chunks of a JSON document,
+    or of NDJSON with a record per line: the calendar, then the months and
+    the holidays of each year.
+
+    Holidays of years not loaded before are released after each year.
+    """
+    if ctx is None:
+        ctx = cal.make_context()
+    loaded = set(cal.holiday_indexes)
+
+    def dumps(record):
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+    def release():
+        for y in set(cal.holiday_indexes) - loaded:
+            cal.release_holidays(y)
+
+    def iter_records():
+        for months, (start, end) in iter_segments(cal, year, years, ctx):
+            if calendar:
+                for y, m in months:
+                    yield month_record(cal, y, m, ctx)
+            if holidays:
+                for day, name in cal.holidays_between(start, end):
+                    yield holiday_record(day, name)
+            release()
+
+    if ndjson:
+        yield (dumps(calendar_record(cal, ctx)) + "\n").encode("utf-8")
+        v = []
+        for record in iter_records():
+            v.append(dumps(record) + "\n")
+            if record["type"] == "month" or len(v) >= CHUNK_RECORDS:
+                yield "".join(v).encode("utf-8")
+                v = []
+        yield "".join(v).encode("utf-8")
+        return
+
+    # the calendar record with "months" and "holidays" lists, holidays are
+    # kept while the months are written so that each year is loaded once
+    yield (dumps(calendar_record(cal, ctx))[:-1] + ',\n"months":[').encode("utf-8")
+    sep = "\n"
+    holiday_lines = []
+    for record in iter_records():
+        if record["type"] == "holiday":
+            holiday_lines.append(dumps(record))
+        else:
+            yield (sep + dumps(record)).encode("utf-8")
+            sep = ",\n"
+    yield b'],\n"holidays":['
+    sep = "\n"
+    for i in range(0, len(holiday_lines), CHUNK_RECORDS):
+        yield (sep + ",\n".join(holiday_lines[i : i + CHUNK_RECORDS])).encode("utf-8")
+        sep = ",\n"
+    yield b"]}\n"
@@ -0,0 +1,146 @@
+import calendar
+import datetime
+
+from .holiday_index import MONTH_OFFSETS
+
+WEEKS = 6
+WEEKEND = (calendar.SATURDAY, calendar.SUNDAY)
+
+
+def import_numpy():
+    """
+    Return the numpy module or None. It is imported on first use, not with
+    this module, to keep the startup of pycal fast.
+    """
+    try:
+        import numpy
+    except ModuleNotFoundError:
+        # optional, the grid is built by pure Python loops without it
+        return None
+    return numpy
+
+
+class MonthGrid:
+    """
+    Day numbers of months as a (months, 6, 7) grid, with masks of the same
+    shape: holidays (bitmask of sources, see HolidayIndex), weekend and today.
+    Days outside a month are 0.
+
+    The arrays are numpy arrays if numpy is installed, otherwise nested lists.
+    """
+
+    def __init__(self, months, weekdays, days, holidays, weekend, today):
+        self.months = months
+        self.weekdays = weekdays
+        self.days = days
+        self.holidays = holidays
+        self.weekend = weekend
+        self.today = today
+        self.positions = {m: i for i, m in enumerate(months)}
+
+    def __len__(self):
+        return len(self.months)
+
+    def weeks(self, year, month):
+        """
+        Return 6 weeks of (day, weekday, holiday mask, is today) cells of a
+        month, the weeks of monthdays2calendar padded to 6.
+        """
+        i = self.positions[year, month]
+        days, holidays, today = self.days[i], self.holidays[i], self.today[i]
+        if not isinstance(days, list):
+            # numpy arrays
+            days, holidays, today = days.tolist(), holidays.tolist(), today.tolist()
+        weekdays = self.weekdays
+        return [
+            list(zip(days[w], weekdays, holidays[w], today[w])) for w in range(WEEKS)
+        ]
+
+
+def month_info(months, firstweekday):
+    """
+    Return [(ordinal of the 1st, number of days, column of the 1st), ...].
+    """
+    v = []
+    for year, month in months:
+        first = datetime.date(year, month, 1).toordinal()
+        num_days = calendar.monthrange(year, month)[1]
+        # date.weekday() is (ordinal + 6) % 7
+        v.append((first, num_days, (first + 6 - firstweekday) % 7))
+    return v
+
+
+def build_grid(months, firstweekday, holiday_indexes, today=None, use_numpy=None):
+    """
+    Return the MonthGrid of (year, month) pairs.
+
+    holiday_indexes is {year: HolidayIndex} of every year of months.
+    Vectorized with numpy if it is installed, unless use_numpy is False.
+    """
+    months = list(months)
+    weekdays = [(firstweekday + i) % 7 for i in range(7)]
+    today = today.toordinal() if today else 0
+    info = month_info(months, firstweekday)
+    if use_numpy is None:
+        use_numpy = import_numpy() is not None
+    if use_numpy and months:
+        arrays = build_arrays_numpy(months, weekdays, info, holiday_indexes, today)
+    else:
+        arrays = build_arrays(months, weekdays, info, holiday_indexes, today)
+    return MonthGrid(months, weekdays, *arrays)
+
+
+def build_arrays(months, weekdays, info, holiday_indexes, today):
+    weekend_days = [wd in WEEKEND for wd in weekdays] * WEEKS
+    days, holidays, weekend, is_today = [], [], [], []
+    for (year, month), (first, num_days, column) in zip(months, info):
+        bitmap = holiday_indexes[year].bitmap
+        offset = MONTH_OFFSETS[calendar.isleap(year)][month] - 1
+        # cells of the 6 weeks, then split into weeks
+        d = [0] * column + list(range(1, num_days + 1))
+        d += [0] * (WEEKS * 7 - len(d))
+        h = [0] * column + list(bitmap[offset + 1 : offset + num_days + 1])
+        h += [0] * (WEEKS * 7 - len(h))
+        e = [bool(x) and we for x, we in zip(d, weekend_days)]
+        t = [False] * (WEEKS * 7)
+        if 0 <= today - first < num_days:
+            t[column + today - first] = True
+        days.append([d[i : i + 7] for i in range(0, WEEKS * 7, 7)])
+        holidays.append([h[i : i + 7] for i in range(0, WEEKS * 7, 7)])
+        weekend.append([e[i : i + 7] for i in range(0, WEEKS * 7, 7)])
+        is_today.append([t[i : i + 7] for i in range(0, WEEKS * 7, 7)])
+    return days, holidays, weekend, is_today
+
+
+def build_arrays_numpy(months, weekdays, info, holiday_indexes, today):
+    numpy = import_numpy()
+    n = len(months)
+    first, num_days, column = (numpy.array(x, dtype=numpy.int64) for x in zip(*info))
+    cells = numpy.arange(WEEKS * 7)
+    day = cells[None, :] - column[:, None] + 1
+    valid = (day >= 1) & (day <= num_days[:, None])
+
+    # day of year of cells in the bitmaps of the years, concatenated
+    years = sorted({year for year, _ in months})
+    bitmaps = [numpy.frombuffer(holiday_indexes[y].bitmap, numpy.uint8) for y in years]
+    starts = dict(zip(years, numpy.cumsum([0] + [len(b) for b in bitmaps[:-1]])))
+    base = numpy.array(
+        [
+            starts[year] + MONTH_OFFSETS[calendar.isleap(year)][month] - 1
+            for year, month in months
+        ],
+        dtype=numpy.int64,
+    )
+    position = numpy.where(valid, base[:, None] + day, 0)
+    holidays = numpy.where(valid, numpy.concatenate(bitmaps)[position], 0)
+
+    weekend = valid & numpy.isin(numpy.array(weekdays), WEEKEND)[cells % 7]
+    is_today = valid & (first[:, None] + day - 1 == today)
+    days = numpy.where(valid, day, 0)
+    shape = (n, WEEKS, 7)
+    return (
+        days.reshape(shape),
+        holidays.astype(numpy.uint8).reshape(shape),
+        weekend.reshape(shape),
+        is_today.reshape(shape),
+    )
@@ -0,0 +1,129 @@
+import bisect
+import calendar
+import datetime
+
+
+def _month_offsets(leap):
+    offsets = [0, 0]
+    for month in range(1, 13):
+        days = calendar.mdays[month]
+        if leap and month == calendar.February:
+            days += 1
+        offsets.append(offsets[-1] + days)
+    return tuple(offsets)
+
+
+# MONTH_OFFSETS[isleap][month] is the day of year (0-based) of the 1st of month.
+# MONTH_OFFSETS[isleap][13] is the number of days in the year.
+MONTH_OFFSETS = (_month_offsets(False), _month_offsets(True))
+
+
+# separator of holiday names of several sources on the same day
+NAME_SEPARATOR = "; "
+
+# a source is a bit of the bitmap entries
+MAX_SOURCES = 8
+
+
+class HolidayIndex:
+    """
+    Holidays of a single year as a day-of-year bitmap plus a name table.
+
+    Each bitmap entry is a bitmask of the sources having a holiday on the day,
+    bit 0 is the first source.
+    """
+
+    def __init__(self, year, items=(), source=0):
+        self.year = year
+        self.offsets = MONTH_OFFSETS[calendar.isleap(year)]
+        self.bitmap = bytearray(self.offsets[13])
+        self.names = {}
+        self.days = []
+        self.add(items, source)
+
+    def add(self, items, source=0):
+        """
+        Add (date, name) pairs of a source, merging names of the same day.
+        """
+        if not 0 <= source < MAX_SOURCES:
+            raise ValueError(f"too many holiday sources: {source + 1}")
+        bit = 1 << source
+        for d, name in items:
+            if d.year != self.year:
+                continue
+            i = self.offsets[d.month] + d.day - 1
+            if self.bitmap[i] and not self.bitmap[i] & bit:
+                name = self.names[i] + NAME_SEPARATOR + name
+            self.bitmap[i] |= bit
+            self.names[i] = name
+        # days of year of the holidays in order, for range queries
+        self.days = sorted(self.names)
+
+    @classmethod
+    def from_holidays(cls, holidays, year):
+        """
+        Build the index from a holidays.HolidayBase instance.
+        """
+        return cls.from_sources([(None, holidays)], year)
+
+    @classmethod
+    def from_sources(cls, sources, year):
+        """
+        Build the index from (label, holidays.HolidayBase) pairs.
+        Names are prefixed by the label unless it is None.
+        """
+        index = cls(year)
+        for source, (label, holidays) in enumerate(sources):
+            # the provider populates the whole year on the first lookup
+            holidays.get(datetime.date(year, 1, 1))
+            items = holidays.items()
+            if label is not None:
+                items = [(d, "%s: %s" % (label, name)) for d, name in items]
+            index.add(items, source)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, month, day):
+        """
+        Return the holiday name of month/day or None.
+        """
+        i = self.offsets[month] + day - 1
+        if self.bitmap[i]:
+            return self.names[i]
+        return None
+
+    def lookup(self, month, day):
+        """
+        Return (bitmask of sources, holiday name) of month/day, or (0, None).
+        """
+        i = self.offsets[month] + day - 1
+        mask = self.bitmap[i]
+        if mask:
+            return mask, self.names[i]
+        return 0, None
+
+    def day_of_year(self, date):
+        """
+        Return the day of year (0-based) of date in this year.
+        """
+        return self.offsets[date.month] + date.day - 1
+
+    def items_between(self, start=0, stop=None):
+        """
+        Iterate (date, name) pairs in date order of days of year start <= i < stop.
+        """
+        lo = bisect.bisect_left(self.days, start)
+        hi = len(self.days) if stop is None else bisect.bisect_left(self.days, stop)
+        first = datetime.date(self.year, 1, 1).toordinal()
+        for i in self.days[lo:hi]:
+            yield datetime.date.fromordinal(first + i), self.names[i]
+
+    def items(self, month=None):
+        """
+        Iterate (date, name) pairs in date order, optionally for one month.
+        """
+        if month is None:
+            return self.items_between()
+        return self.items_between(self.offsets[month], self.offsets[month + 1])
@@ -0,0 +1,41 @@
+import calendar
+import threading
+from collections import namedtuple
+from typing import Dict, Optional
+
+# month_name and month_abbr are indexed by month (1-12) like the calendar module,
+# day_name and day_abbr by weekday (0 is monday).
+LocaleNames = namedtuple(
+    "LocaleNames", ["month_name", "month_abbr", "day_name", "day_abbr"]
+)
+
+locale_names_cache: Dict[Optional[str], LocaleNames] = {}
+locale_names_lock = threading.Lock()
+
+
+def get_locale_names(locale=None):
+    """
+    Return month and weekday names of locale.
+
+    Names are resolved with setlocale only the first time a locale is used,
+    so that rendering does not touch the process-wide locale.
+    """
+    names = locale_names_cache.get(locale)
+    if names is None:
+        with locale_names_lock:
+            names = locale_names_cache.get(locale)
+            if names is None:
+                names = locale_names_cache[locale] = load_locale_names(locale)
+    return names
+
+
+def load_locale_names(locale=None):
+    if locale is not None:
+        with calendar.different_locale(locale):
+            return load_locale_names()
+    return LocaleNames(
+        tuple(calendar.month_name),
+        tuple(calendar.month_abbr),
+        tuple(calendar.day_name),
+        tuple(calendar.day_abbr),
+    )
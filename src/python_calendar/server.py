@@ -0,0 +1,192 @@
+import datetime
+import hashlib
+import re
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import holidays
+
+from .calendar import HTMLCalendar
+
+# /COUNTRY/YEAR, /COUNTRY/YEAR/MONTH or /COUNTRY/YEAR/holidays
+PATH_PATTERN = re.compile(
+    r"^/(?P<code>[A-Za-z]{2,4})/(?P<year>\d{4})(?:/(?P<what>\d{1,2}|holidays))?/?$"
+)
+
+
+class CalendarRequestHandler(BaseHTTPRequestHandler):
+    server_version = "pycal"
+
+    def do_GET(self):
+        self.respond(body=True)
+
+    def do_HEAD(self):
+        self.respond(body=False)
+
+    def respond(self, body):
+        url = urlparse(self.path)
+        match = PATH_PATTERN.match(url.path)
+        if match is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        code = match.group("code").upper()
+        year = int(match.group("year"))
+        # the page of a year ends on January 1st of the next year
+        if not datetime.MINYEAR <= year < datetime.MAXYEAR:
+            self.send_error(HTTPStatus.NOT_FOUND, f"No such year {year}")
+            return
+        what = match.group("what")
+        month = int(what) if what and what.isdigit() else None
+        if month is not None and not 1 <= month <= 12:
+            self.send_error(HTTPStatus.NOT_FOUND, f"No such month {month}")
+            return
+        subdiv = parse_qs(url.query).get("subdiv", [None])[0]
+
+        if not self.server.semaphore.acquire(timeout=self.server.queue_timeout):
+            self.send_error(HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        try:
+            content = self.server.render(
+                code, year, month=month, subdiv=subdiv, holidays=(what == "holidays")
+            )
+        except NotImplementedError as exc:
+            self.send_error(HTTPStatus.NOT_FOUND, str(exc))
+            return
+        except ValueError as exc:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        finally:
+            self.server.semaphore.release()
+
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header(
+            "Content-Type", f"application/xhtml+xml; charset={self.server.encoding}"
+        )
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def etag_matches(header, etag):
+    """
+    Return True if an If-None-Match header value matches etag.
+    """
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+class CalendarServer(ThreadingHTTPServer):
+    """
+    HTTP server rendering calendars from warm HTMLCalendar instances.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        max_workers=8,
+        queue_timeout=30,
+        firstweekday=6,
+        locale=None,
+        width=3,
+        css_content=None,
+        encoding="utf-8",
+        quiet=False,
+    ):
+        super().__init__(address, CalendarRequestHandler)
+        self.semaphore = threading.BoundedSemaphore(max_workers)
+        self.queue_timeout = queue_timeout
+        self.firstweekday = firstweekday
+        self.locale = locale
+        self.width = width
+        self.css_content = css_content
+        self.encoding = encoding
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        # {(code, subdiv): HTMLCalendar}
+        self.calendars = {}
+
+    def get_calendar(self, code, subdiv=None):
+        """
+        Return a calendar for a country or financial market.
+        """
+        financial = code in holidays.list_supported_financial()
+        if financial:
+            # markets have no subdivisions, do not build a calendar per value
+            subdiv = None
+        key = (code, subdiv)
+        with self.lock:
+            cal = self.calendars.get(key)
+            if cal is None:
+                if financial:
+                    options = dict(financial=code)
+                else:
+                    options = dict(country=code, subdiv=subdiv)
+                cal = HTMLCalendar(
+                    firstweekday=self.firstweekday,
+                    locale=self.locale,
+                    month_cache_size=256,
+                    **options,
+                )
+                self.calendars[key] = cal
+        return cal
+
+    def render(self, code, year, month=None, subdiv=None, holidays=False):
+        """
+        Return an encoded page for a year, a month or a holiday list.
+        """
+        cal = self.get_calendar(code, subdiv)
+        ctx = cal.make_context(
+            startmonth=month or 1,
+            num_month=1 if month else 12,
+            today=datetime.date.today(),
+        )
+        return cal.formatyearpage(
+            year,
+            width=1 if month else self.width,
+            css=None,
+            css_content=self.css_content,
+            encoding=self.encoding,
+            holidays=holidays,
+            calendar=not holidays,
+            ctx=ctx,
+        )
+
+
+def serve(host="127.0.0.1", port=8000, **kwargs):
+    """
+    Run a CalendarServer until interrupted.
+    """
+    with CalendarServer((host, port), **kwargs) as httpd:
+        host, port = httpd.server_address[:2]
+        if not httpd.quiet:
+            print(f"Serving calendars on http://{host}:{port}/", file=sys.stderr)
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
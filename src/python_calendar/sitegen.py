@@ -0,0 +1,304 @@
+import datetime
+import hashlib
+import html
+import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict
+
+from .cache import RENDER_CACHE_VERSION, get_package_version
+from .calendar import HTMLCalendar
+from .util import open_for_write_binary
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# folder of content hashed stylesheets, pages link ../../assets/NAME
+ASSETS_DIR = "assets"
+
+# years of a task, a worker renders them with one calendar
+TASK_YEARS = 10
+
+# options shared by every page of a site
+SiteOptions = namedtuple(
+    "SiteOptions",
+    [
+        "output_dir",
+        "firstweekday",
+        "locale",
+        "width",
+        "holidays",
+        "visible_today",
+        "today",
+        "financial_codes",
+    ],
+)
+
+# calendars of a worker process, {(code, options): HTMLCalendar}
+calendars: Dict[tuple, HTMLCalendar] = {}
+
+
+def expand_codes(codes, subdivs=()):
+    """
+    Return page codes of countries or markets plus "CC-SUB" codes of subdivs
+    for every country having them.
+    """
+    import holidays
+
+    financial = holidays.list_supported_financial()
+    result = []
+    for code in codes:
+        result.append(code)
+        if code in financial or "-" in code or not subdivs:
+            continue
+        try:
+            supported = holidays.country_holidays(code).subdivisions
+        except NotImplementedError:
+            continue
+        result.extend("%s-%s" % (code, s) for s in subdivs if s in supported)
+    return list(dict.fromkeys(result))
+
+
+def page_path(style, code, year):
+    """
+    Return the path of a page relative to the output directory.
+    """
+    return "%s/%s/%d.html" % (style, code, year)
+
+
+def page_inputs(options, style, css, css_content, code, year):
+    """
+    Return a hash of everything the content of a page depends on.
+    """
+    # only the page containing today changes with the date, and only if marked
+    marked = options.visible_today and options.today.year == year
+    inputs = dict(
+        version=RENDER_CACHE_VERSION,
+        python_calendar=get_package_version("python-calendar"),
+        holidays_version=get_package_version("holidays"),
+        firstweekday=options.firstweekday,
+        locale=options.locale,
+        width=options.width,
+        holidays=options.holidays,
+        style=style,
+        css_href=css,
+        css=hashlib.sha256((css_content or "").encode("utf-8")).hexdigest(),
+        code=code,
+        year=year,
+        today=options.today.isoformat() if marked else None,
+    )
+    data = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def get_calendar(options, code):
+    cal = calendars.get((code, options))
+    if cal is None:
+        if code in options.financial_codes:
+            sources = dict(financial=code)
+        else:
+            sources = dict(country=code)
+        cal = calendars[(code, options)] = HTMLCalendar(
+            firstweekday=options.firstweekday,
+            locale=options.locale,
+            visible_today=options.visible_today,
+            today=options.today,
+            **sources,
+        )
+    return cal
+
+
+def render_pages(options, style, css, css_content, code, years):
+    """
+    Write pages of code for years and return [(path, content hash), ...].
+    """
+    cal = get_calendar(options, code)
+    result = []
+    for year in years:
+        path = page_path(style, code, year)
+        content_hash = hashlib.sha256()
+        with open_for_write_binary(Path(options.output_dir, path)) as fh:
+            for chunk in cal.iterformatyearpage(
+                year,
+                width=options.width,
+                css=css,
+                css_content=css_content,
+                encoding="utf-8",
+                holidays=options.holidays,
+            ):
+                fh.write(chunk)
+                content_hash.update(chunk)
+        result.append((path, content_hash.hexdigest()))
+    return result
+
+
+def format_index(title, links):
+    """
+    Return an index page of (href, text) links.
+    """
+    v = []
+    a = v.append
+    a('<?xml version="1.0" encoding="utf-8"?>\n')
+    a(
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">\n'
+    )
+    a("<html>\n")
+    a("<head>\n")
+    a('<meta http-equiv="Content-Type" content="text/html; charset=utf-8" />\n')
+    a("<title>%s</title>\n" % html.escape(title))
+    a("</head>\n")
+    a("<body>\n")
+    a("<h1>%s</h1>\n" % html.escape(title))
+    a("<ul>\n")
+    for href, text in links:
+        a('<li><a href="%s">%s</a></li>\n' % (html.escape(href), html.escape(text)))
+    a("</ul>\n")
+    a("</body>\n")
+    a("</html>\n")
+    return "".join(v).encode("utf-8")
+
+
+def write_indexes(output_dir, paths):
+    """
+    Write index pages of the site, of each style and of each code.
+    """
+    tree = {}
+    for path in sorted(paths):
+        style, code, name = path.split("/")
+        year = int(name[: -len(".html")])
+        tree.setdefault(style, {}).setdefault(code, []).append(year)
+
+    indexes = {
+        "index.html": format_index(
+            "Calendars", [("%s/index.html" % style, style) for style in tree]
+        )
+    }
+    for style, codes in tree.items():
+        indexes["%s/index.html" % style] = format_index(
+            "Calendars (%s)" % style,
+            [("%s/index.html" % code, code) for code in codes],
+        )
+        for code, years in codes.items():
+            indexes["%s/%s/index.html" % (style, code)] = format_index(
+                "%s calendars" % code,
+                [("%d.html" % year, str(year)) for year in sorted(years)],
+            )
+    for path, content in indexes.items():
+        with open_for_write_binary(Path(output_dir, path)) as fh:
+            fh.write(content)
+    return list(indexes)
+
+
+def load_manifest(output_dir):
+    try:
+        with open(Path(output_dir, MANIFEST)) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("pages", {})
+
+
+def write_manifest(output_dir, pages):
+    content = json.dumps(
+        {"version": MANIFEST_VERSION, "pages": pages}, indent=1, sort_keys=True
+    )
+    with open_for_write_binary(Path(output_dir, MANIFEST)) as fh:
+        fh.write(content.encode("utf-8") + b"\n")
+
+
+def build_site(
+    output_dir,
+    codes,
+    years,
+    styles,
+    firstweekday=6,
+    locale=None,
+    width=3,
+    holidays=False,
+    visible_today=False,
+    today=None,
+    max_workers=None,
+    force=False,
+    css_assets=False,
+    log=None,
+):
+    """
+    Render pages of codes and years in every style, with index pages and
+    a manifest of content hashes. Pages whose inputs did not change since
+    the last build are skipped.
+
+    styles is {name: css content}, inlined in pages or, with css_assets,
+    written minified as assets/NAME.HASH.css. Return (rendered, skipped)
+    counts.
+    """
+    import holidays as holidays_module
+
+    from .assets import write_css_asset
+
+    options = SiteOptions(
+        output_dir=str(output_dir),
+        firstweekday=firstweekday,
+        locale=locale,
+        width=width,
+        holidays=holidays,
+        visible_today=visible_today,
+        today=today or datetime.date.today(),
+        financial_codes=tuple(holidays_module.list_supported_financial()),
+    )
+    old = load_manifest(output_dir)
+    # pages of previous runs stay in the manifest and in the indexes
+    manifest = dict(old)
+    tasks = []
+    skipped = 0
+    for style, css_content in styles.items():
+        css = None
+        if css_assets:
+            name = write_css_asset(Path(output_dir, ASSETS_DIR), css_content, style)
+            css = "../../%s/%s" % (ASSETS_DIR, name)
+            css_content = None
+        for code in codes:
+            todo = []
+            for year in years:
+                path = page_path(style, code, year)
+                inputs = page_inputs(options, style, css, css_content, code, year)
+                entry = old.get(path)
+                if (
+                    not force
+                    and entry
+                    and entry["inputs"] == inputs
+                    and Path(output_dir, path).is_file()
+                ):
+                    manifest[path] = entry
+                    skipped += 1
+                else:
+                    manifest[path] = {"inputs": inputs}
+                    todo.append(year)
+            for i in range(0, len(todo), TASK_YEARS):
+                chunk = todo[i : i + TASK_YEARS]
+                tasks.append((options, style, css, css_content, code, chunk))
+
+    def record(result):
+        for path, content_hash in result:
+            manifest[path]["content"] = content_hash
+            if log:
+                log(f"Wrote {path}")
+
+    try:
+        if max_workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                record(render_pages(*task))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(render_pages, *task) for task in tasks]
+                for future in futures:
+                    record(future.result())
+    finally:
+        # keep what was rendered, failed pages have no content hash
+        manifest = {k: v for k, v in manifest.items() if "content" in v}
+        write_manifest(output_dir, manifest)
+
+    write_indexes(output_dir, manifest)
+    return sum(len(task[5]) for task in tasks), skipped
@@ -0,0 +1,239 @@
+import datetime
+import json
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+
+import click
+from click.testing import CliRunner
+
+from .. import cli
+from ..calendar import HTMLCalendar
+
+BENCHMARK_VERSION = 1
+
+# calendars to benchmark, keyword arguments of HTMLCalendar
+SOURCES = {
+    "US": dict(country="US"),
+    "JP": dict(country="JP"),
+    "GB": dict(country="GB"),
+    "DE": dict(country="DE", subdiv="BY"),
+    "NYSE": dict(financial="NYSE"),
+    "ECB": dict(financial="ECB"),
+}
+
+YEAR = 2023
+TODAY = datetime.date(YEAR, 6, 15)
+
+# a benchmark is slower than the baseline if seconds grew by more than this ratio
+DEFAULT_THRESHOLD = 1.25
+
+
+def make_calendar(source):
+    return HTMLCalendar(6, today=TODAY, **SOURCES[source])
+
+
+def bench_formatday(cal):
+    ctx = cal.make_month_context(YEAR, 5)
+    weeks = cal.monthdays2calendar(YEAR, 5)
+    days = [day for week in weeks for day in week]
+
+    def run():
+        for day, weekday in days:
+            cal.formatday(day, weekday, ctx)
+
+    return run
+
+
+def bench_formatmonth(cal):
+    ctx = cal.make_context()
+    return lambda: cal.formatmonth(YEAR, 5, ctx=ctx)
+
+
+def bench_formatyear(cal):
+    return lambda: cal.formatyear(YEAR)
+
+
+def bench_formatyearpage(cal):
+    return lambda: cal.formatyearpage(YEAR, encoding="utf-8")
+
+
+def bench_formatyearpage_holidays(cal):
+    return lambda: cal.formatyearpage(YEAR, encoding="utf-8", holidays=True)
+
+
+def bench_get_holiday_list(cal):
+    return lambda: cal.get_holiday_list(YEAR)
+
+
+def bench_build(source):
+    # a cold calendar, including the holiday provider and index of the year
+    return lambda: make_calendar(source).get_holiday_list(YEAR)
+
+
+CALENDAR_BENCHMARKS = {
+    "formatday": bench_formatday,
+    "formatmonth": bench_formatmonth,
+    "formatyear": bench_formatyear,
+    "formatyearpage": bench_formatyearpage,
+    "formatyearpage_holidays": bench_formatyearpage_holidays,
+    "get_holiday_list": bench_get_holiday_list,
+}
+
+
+def bench_cli(folder):
+    runner = CliRunner()
+    output = str(Path(folder) / "calendar.html")
+    args = ["-q", "-n", "-H", "--no-cache", "--locale", "C", "-C", "US", str(YEAR)]
+    args += ["-o", output]
+
+    def run():
+        result = runner.invoke(cli.main, args)
+        if result.exit_code != 0:
+            raise RuntimeError(result.output)
+
+    return run
+
+
+def iter_benchmarks(folder):
+    """
+    Yield (name, function) of every benchmark.
+    """
+    for source in SOURCES:
+        yield "%s.build" % source, bench_build(source)
+        cal = make_calendar(source)
+        for name, factory in CALENDAR_BENCHMARKS.items():
+            yield "%s.%s" % (source, name), factory(cal)
+    yield "cli.main", bench_cli(folder)
+
+
+def measure(func, number=None, repeat=5):
+    """
+    Return {"seconds": best seconds per call, "ops": calls per second,
+    "peak_bytes": tracemalloc peak of a call}.
+    """
+    func()  # warm up
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": seconds,
+        "ops": 1 / seconds if seconds else None,
+        "number": number,
+        "peak_bytes": peak,
+    }
+
+
+def run_benchmarks(patterns=(), number=None, repeat=5, log=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for name, func in iter_benchmarks(folder):
+            if patterns and not any(p in name for p in patterns):
+                continue
+            results[name] = result = measure(func, number=number, repeat=repeat)
+            if log:
+                log(
+                    "%-36s %12.1f us %10.1f KiB"
+                    % (name, result["seconds"] * 1e6, result["peak_bytes"] / 1024)
+                )
+    return {
+        "version": BENCHMARK_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD, thresholds=None):
+    """
+    Return [(name, ratio, threshold), ...] of benchmarks slower than baseline.
+    thresholds are per benchmark ratios, taken from the baseline by default.
+    """
+    if thresholds is None:
+        thresholds = baseline.get("thresholds", {})
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["seconds"]:
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        limit = thresholds.get(name, threshold)
+        if ratio > limit:
+            regressions.append((name, ratio, limit))
+    return regressions
+
+
+@click.command()
+@click.option("-o", "--output", type=click.Path(), help="write results as json")
+@click.option(
+    "-b",
+    "--baseline",
+    type=click.Path(exists=True),
+    help="compare with a previous json result",
+)
+@click.option(
+    "-t",
+    "--threshold",
+    type=float,
+    default=DEFAULT_THRESHOLD,
+    show_default=True,
+    help="slowdown ratio against the baseline treated as a regression",
+)
+@click.option(
+    "-k",
+    "--filter",
+    "patterns",
+    multiple=True,
+    help="run benchmarks whose name contains the text",
+)
+@click.option("--number", type=int, help="calls per repeat (auto by default)")
+@click.option("--repeat", type=int, default=5, show_default=True)
+def main(output, baseline, threshold, patterns, number, repeat):
+    """
+    Benchmark rendering and holiday lookups.
+    """
+    started = time.perf_counter()
+
+    def log(message):
+        click.echo(message, err=True)
+
+    report = run_benchmarks(patterns, number=number, repeat=repeat, log=log)
+    elapsed = time.perf_counter() - started
+    log("%d benchmarks in %.1fs" % (len(report["results"]), elapsed))
+
+    base = None
+    if baseline:
+        with open(baseline) as fh:
+            base = json.load(fh)
+        # keep per benchmark thresholds of the baseline
+        if base.get("thresholds"):
+            report["thresholds"] = base["thresholds"]
+
+    if output:
+        with open(output, "w") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+
+    if base:
+        regressions = compare(report, base, threshold)
+        for name, ratio, limit in regressions:
+            log("REGRESSION %s: %.2fx slower (threshold %.2fx)" % (name, ratio, limit))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -1,3 +1,4 @@
+import bisect
 import itertools
 from typing import Dict
 
@@ -6,12 +7,25 @@ class HolidayBase:
     CONVERT: Dict[str, str] = {}
 
     def __init__(self):
+        # {year: [(date, name), ...]}
         self.cache = {}
+        # {date: name} of every loaded year
         self.cache_by_date = {}
+        # holidays of every loaded year sorted by date, and their ordinals
+        self.sorted_items = []
+        self.ordinals = []
+        self.sorted_years = 0
 
     def _get_by_year(self, year):
         raise NotImplementedError()
 
+    def _get_by_years(self, years):
+        """
+        Return {year: [(date, name), ...]} of years.
+        Override if the provider can load several years at once.
+        """
+        return {year: self._get_by_year(year) for year in years}
+
     def normalize_name(self, name):
         if self.CONVERT is not None:
             try:
@@ -20,18 +34,50 @@ class HolidayBase:
                 pass
         return name
 
+    def load_years(self, years):
+        """
+        Load holidays of years that are not loaded yet.
+        """
+        missing = [year for year in dict.fromkeys(years) if year not in self.cache]
+        if not missing:
+            return
+        for year, items in self._get_by_years(missing).items():
+            items = list(sorted(items, key=lambda x: x[0]))
+            self.cache[year] = items
+            self.cache_by_date.update(items)
+
+    def sort_items(self):
+        # rebuilt lazily, so that loading many years one by one stays linear
+        if self.sorted_years != len(self.cache):
+            self.sorted_items = sorted(
+                itertools.chain.from_iterable(self.cache.values()),
+                key=lambda x: x[0],
+            )
+            self.ordinals = [dt.toordinal() for dt, _ in self.sorted_items]
+            self.sorted_years = len(self.cache)
+
     def get_by_year(self, year):
-        if year not in self.cache:
-            self.cache[year] = list(sorted(self._get_by_year(year), key=lambda x: x[0]))
-            self.cache_by_date = dict(self.cache[year])
+        self.load_years([year])
         return self.cache[year]
 
     def get_holiday_name(self, date):
-        self.get_by_year(date.year)
+        self.load_years([date.year])
         return self.cache_by_date.get(date)
 
     def get_by_years(self, years):
-        return list(itertools.chain.from_iterable([self.get_by_year(y) for y in years]))
+        years = list(years)
+        self.load_years(years)
+        return list(itertools.chain.from_iterable(self.cache[y] for y in years))
+
+    def between(self, start, end):
+        """
+        Return (date, name) of holidays in start <= date < end sorted by date.
+        """
+        self.load_years(range(start.year, end.year + 1))
+        self.sort_items()
+        lo = bisect.bisect_left(self.ordinals, start.toordinal())
+        hi = bisect.bisect_left(self.ordinals, end.toordinal(), lo)
+        return self.sorted_items[lo:hi]
 
     def format_item(self, item):
         return "{} {}".format(item[0].strftime("%Y/%m/%d"), item[1])
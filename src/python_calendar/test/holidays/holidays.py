@@ -15,4 +15,11 @@ class Holidays(HolidayBase):
     }
 
     def _get_by_year(self, year):
-        return holidays.JP(years=[year]).items()
+        return self._get_by_years([year])[year]
+
+    def _get_by_years(self, years):
+        # building holidays.JP is costly, build it once for all years
+        result = {year: [] for year in years}
+        for dt, name in holidays.JP(years=years).items():
+            result[dt.year].append((dt, name))
+        return result
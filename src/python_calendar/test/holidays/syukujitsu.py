@@ -1,8 +1,41 @@
-import csv
 import datetime
+import mmap
+import os
+import struct
+import tempfile
 
 from .holiday_base import HolidayBase
 
+# binary sidecar of the csv file:
+#   header   magic, version, csv mtime_ns, csv size, number of years, rows, names
+#   years    (year, first row, last row + 1) * number of years
+#   rows     (date ordinal, name number) * number of rows
+#   names    utf-8 names separated by "\n"
+SIDECAR_MAGIC = b"SYKJ"
+SIDECAR_VERSION = 1
+SIDECAR_HEADER = struct.Struct("<4sHqqIII")
+SIDECAR_YEAR = struct.Struct("<HII")
+SIDECAR_ROW = struct.Struct("<IH")
+
+
+def parse_date(text):
+    """
+    Parse "YYYY/M/D" without strptime.
+    """
+    year, month, day = text.split("/")
+    return datetime.date(int(year), int(month), int(day))
+
+
+def build_year_index(dates):
+    """
+    Return {year: (start, stop)} of sorted dates.
+    """
+    index = {}
+    for i, dt in enumerate(dates):
+        start, _ = index.get(dt.year, (i, i))
+        index[dt.year] = (start, i + 1)
+    return index
+
 
 class Syukujitsu(HolidayBase):
     CONVERT = {
@@ -13,22 +46,132 @@ class Syukujitsu(HolidayBase):
     }
     rows = None
 
-    def __init__(self, filename="syukujitsu.csv"):
+    def __init__(self, filename="syukujitsu.csv", sidecar=True):
         super().__init__()
         self.csv_filename = filename
+        self.sidecar_filename = filename + ".bin" if sidecar else None
+        # {year: (start, stop)} of rows
+        self.year_index = None
+        # rows are decoded from the memory mapped sidecar lazily
+        self.sidecar = None
+
+    def parse_csv(self):
+        """
+        Return (date, name) rows of the csv file sorted by date.
+        """
+        rows = []
+        with open(self.csv_filename, encoding="cp932") as fh:
+            next(fh, None)
+            for line in fh:
+                line = line.strip()
+                if line:
+                    date, name = line.split(",", 1)
+                    rows.append((parse_date(date), name))
+        rows.sort(key=lambda x: x[0])
+        return rows
+
+    def csv_stat(self):
+        st = os.stat(self.csv_filename)
+        return st.st_mtime_ns, st.st_size
+
+    def write_sidecar(self, rows):
+        names = list(dict.fromkeys(name for _, name in rows))
+        name_number = {name: i for i, name in enumerate(names)}
+        year_index = build_year_index([dt for dt, _ in rows])
+        mtime_ns, size = self.csv_stat()
+        v = [
+            SIDECAR_HEADER.pack(
+                SIDECAR_MAGIC,
+                SIDECAR_VERSION,
+                mtime_ns,
+                size,
+                len(year_index),
+                len(rows),
+                len(names),
+            )
+        ]
+        v += [SIDECAR_YEAR.pack(y, *year_index[y]) for y in sorted(year_index)]
+        v += [SIDECAR_ROW.pack(dt.toordinal(), name_number[n]) for dt, n in rows]
+        v.append("\n".join(names).encode("utf-8"))
+        # a unique temporary file, other processes may write the sidecar too
+        folder = os.path.dirname(os.path.abspath(self.sidecar_filename))
+        with tempfile.NamedTemporaryFile("wb", dir=folder, delete=False) as fh:
+            fh.write(b"".join(v))
+        try:
+            os.replace(fh.name, self.sidecar_filename)
+        except OSError:
+            os.unlink(fh.name)
+            raise
+
+    def load_sidecar(self):
+        """
+        Map the sidecar file if it is up to date with the csv file.
+        Return True on success.
+        """
+        try:
+            with open(self.sidecar_filename, "rb") as fh:
+                buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            header = SIDECAR_HEADER.unpack_from(buf)
+        except struct.error:
+            header = (None,) * 7
+        magic, version, mtime_ns, size, num_years, num_rows, num_names = header
+        if (magic, version, mtime_ns, size) != (
+            SIDECAR_MAGIC,
+            SIDECAR_VERSION,
+            *self.csv_stat(),
+        ):
+            buf.close()
+            return False
+        offset = SIDECAR_HEADER.size
+        self.year_index = {}
+        for _ in range(num_years):
+            year, start, stop = SIDECAR_YEAR.unpack_from(buf, offset)
+            self.year_index[year] = (start, stop)
+            offset += SIDECAR_YEAR.size
+        self.rows_offset = offset
+        self.num_rows = num_rows
+        offset += SIDECAR_ROW.size * num_rows
+        self.names = buf[offset:].decode("utf-8").split("\n")
+        self.sidecar = buf
+        return True
+
+    def load(self):
+        """
+        Load the year index from the sidecar file, or parse the csv file.
+        """
+        if self.year_index is not None:
+            return
+        if self.sidecar_filename and self.load_sidecar():
+            return
+        self.rows = self.parse_csv()
+        self.year_index = build_year_index([dt for dt, _ in self.rows])
+        if self.sidecar_filename:
+            try:
+                self.write_sidecar(self.rows)
+            except OSError:
+                pass
 
     def get_data(self):
+        self.load()
         if self.rows is None:
-            with open(self.csv_filename, encoding="cp932") as out:
-                reader = csv.reader(out)
-                next(reader, None)
-                self.rows = [
-                    (datetime.datetime.strptime(date, "%Y/%m/%d").date(), name)
-                    for date, name in reader
-                ]
+            self.rows = self.get_rows(0, self.num_rows)
         return self.rows
 
+    def get_rows(self, start, stop):
+        if self.rows is not None:
+            return self.rows[start:stop]
+        offset = self.rows_offset + SIDECAR_ROW.size * start
+        buf = self.sidecar[offset : offset + SIDECAR_ROW.size * (stop - start)]
+        names = self.names
+        return [
+            (datetime.date.fromordinal(ordinal), names[i])
+            for ordinal, i in SIDECAR_ROW.iter_unpack(buf)
+        ]
+
     def _get_by_year(self, year):
-        dt1 = datetime.date(year, 1, 1)
-        dt2 = datetime.date(year + 1, 1, 1)
-        return [x for x in self.get_data() if dt1 <= x[0] < dt2]
+        self.load()
+        start, stop = self.year_index.get(year, (0, 0))
+        return self.get_rows(start, stop)
@@ -1,9 +1,18 @@
 import datetime
+import io
+import locale
+from concurrent.futures import ThreadPoolExecutor
 
+import pytest
+
+from python_calendar import grid
+from python_calendar.bizday import BusinessCalendar, parse_weekend
 from python_calendar.calendar import HTMLCalendar
-from python_calendar.util import dot_path
+from python_calendar.text import TextCalendar
+from python_calendar.util import dot_path, parse_year_range
 
-from .holidays import Holidays
+from .holidays import Holidays, Syukujitsu
+from .verify import diff_shard
 
 
 def test_app():
@@ -30,3 +39,274 @@ def test_normalize_holiday_name():
     name2 = instance.normalize_name(name1)
     assert name1 == "体育の日"
     assert name2 == "スポーツの日"
+
+
+def test_holiday_list():
+    cal = HTMLCalendar(firstweekday=0, startmonth=4, country="JP")
+    days = cal.get_holiday_list(2023)
+    assert days[0] == (datetime.date(2023, 4, 29), "昭和の日")
+    assert days[-1] == (datetime.date(2024, 3, 20), "春分の日")
+    assert days == sorted(days)
+    assert sorted(cal.holiday_indexes) == [2023, 2024]
+    assert cal.get_holiday_index(2023).get(5, 3) == "憲法記念日"
+    assert cal.get_holiday_index(2023).get(5, 2) is None
+
+
+def test_holidays_between():
+    cal = HTMLCalendar(country="JP")
+    start, end = datetime.date(2022, 12, 31), datetime.date(2025, 1, 1)
+    days = list(cal.holidays_between(start, end))
+    assert days[0] == (datetime.date(2023, 1, 1), "元日")
+    assert days[-1][0].year == 2024
+    assert days == sorted(days)
+    assert sorted(cal.holiday_indexes) == [2022, 2023, 2024]
+    # end is exclusive
+    day = datetime.date(2023, 5, 3)
+    assert list(cal.holidays_between(day, day)) == []
+    assert list(cal.holidays_between(day, day + datetime.timedelta(1))) == [
+        (day, "憲法記念日")
+    ]
+
+
+def test_business_calendar():
+    cal = BusinessCalendar(country="JP", years=range(2022, 2025))
+    day = datetime.date
+    assert cal.is_business_day(day(2023, 5, 2))
+    assert not cal.is_business_day(day(2023, 5, 3))
+    assert cal.get_holiday(day(2023, 5, 3)) == "憲法記念日"
+    assert not cal.is_business_day(day(2023, 5, 6))
+    assert cal.add_business_days(day(2023, 5, 2), 1) == day(2023, 5, 8)
+    assert cal.add_business_days(day(2023, 5, 8), -1) == day(2023, 5, 2)
+    assert cal.add_business_days(day(2023, 5, 3), 0) == day(2023, 5, 8)
+    assert cal.business_days_between(day(2023, 5, 1), day(2023, 6, 1)) == 20
+    assert cal.business_days_between(day(2023, 6, 1), day(2023, 5, 1)) == -20
+    assert cal.business_days_between(day(2024, 1, 1), day(2025, 1, 1)) > 0
+
+    # same as walking the days
+    start = day(2022, 12, 20)
+    dates = [start + datetime.timedelta(i) for i in range(60)]
+    flags = cal.is_business_day_batch(dates)
+    walked = [d for d, f in zip(dates, flags) if f]
+    assert cal.add_business_days_batch(dates[:1] * 5, [1, 2, 3, 4, 5]) == walked[1:6]
+    assert cal.business_days_between_batch([start], [dates[-1]]) == [
+        len(walked) - flags[-1]
+    ]
+
+    with pytest.raises(ValueError):
+        cal.is_business_day(day(2025, 1, 1))
+    with pytest.raises(ValueError):
+        cal.add_business_days(day(2024, 12, 30), 10)
+
+    assert parse_weekend("fri,sat") == parse_weekend("0000110") == parse_weekend([4, 5])
+    cal = BusinessCalendar(financial="NYSE", years=range(2023, 2024), weekend="sun")
+    assert cal.is_business_day(day(2023, 5, 6))
+    assert not cal.is_business_day(day(2023, 7, 4))
+
+
+def test_holiday_overlay():
+    today = datetime.date(2023, 6, 1)
+    cal = HTMLCalendar(6, country="US,JP", financial="NYSE", today=today)
+    month = cal.formatmonth(2023, 1)
+    assert (
+        '<td class="day mon holiday holiday-us holiday-jp holiday-nyse" title="US:'
+        in month
+    )
+    # 成人の日 is a holiday of JP only
+    day = datetime.date(2023, 1, 9)
+    assert cal.get_holiday_index(2023).lookup(1, 9) == (0b010, "JP: 成人の日")
+    assert (day, "JP: 成人の日") in cal.get_holiday_list(2023)
+
+    # a single source is rendered as before
+    single = HTMLCalendar(6, country="US", today=today)
+    assert '<td class="day mon holiday" title="New Year' in single.formatmonth(2023, 1)
+    assert single.holiday_cssclasses == ["", ""]
+
+
+def test_cell_tables():
+    today = datetime.date(2023, 5, 10)
+    cal = HTMLCalendar(country="JP", today=today)
+    ctx = cal.make_month_context(2023, 5)
+    assert (
+        cal.formatday(2, 1, ctx) == '<td class="day tue"><span style="">2</span></td>'
+    )
+    assert cal.formatday(10, 2, ctx) is cal.day_cells[True][2][10]
+    assert cal.formatday(3, 2, ctx) == (
+        '<td class="day wed holiday" title="憲法記念日">'
+        '<div><span style="">3</span></div></td>'
+    )
+    # calendars of the same configuration share the tables
+    assert HTMLCalendar(country="US").day_cells is cal.day_cells
+
+    marked = HTMLCalendar(
+        country="JP", visible_holiday=True, visible_today=True, inline_style=True
+    )
+    ctx = ctx._replace(today=datetime.date(2023, 5, 3))
+    assert marked.formatday(3, 2, ctx) == (
+        '<td class="day wed holiday" title="憲法記念日"><div>'
+        '<span style="color: red; background: white">[(3)]</span></div></td>'
+    )
+
+
+def test_month_grid(monkeypatch):
+    today = datetime.date(2024, 2, 29)
+    cal = HTMLCalendar(firstweekday=6, country="US,JP", today=today)
+    months = [(2023, 12)] + [(2024, m) for m in range(1, 13)]
+    indexes = {y: cal.get_holiday_index(y) for y in (2023, 2024)}
+    result = grid.build_grid(months, cal.firstweekday, indexes, today, False)
+    for y, m in months:
+        weeks = cal.monthdays2calendar(y, m)
+        weeks += [[(0, 0)] * 7] * (6 - len(weeks))
+        assert [[(d, wd) for d, wd, _, _ in w] for w in result.weeks(y, m)] == [
+            [(d, (6 + i) % 7) for i, (d, _) in enumerate(w)] for w in weeks
+        ]
+    may = result.weeks(2024, 5)
+    assert [c[2] for w in may for c in w if c[0] in (3, 6, 27)] == [2, 2, 1]
+    assert [c[0] for w in result.weeks(2024, 2) for c in w if c[3]] == [29]
+    june = zip(result.days[6], result.weekend[6])
+    weekend = [d for days, mask in june for d, x in zip(days, mask) if x]
+    assert weekend == [1, 2, 8, 9, 15, 16, 22, 23, 29, 30]
+
+    # numpy is optional and gives the same grid and pages
+    page = cal.formatyearpage(2024, css=None, css_content="")
+    if grid.import_numpy() is not None:
+        vectorized = grid.build_grid(months, cal.firstweekday, indexes, today, True)
+        for name in ("days", "holidays", "weekend", "today"):
+            assert getattr(vectorized, name).tolist() == getattr(result, name)
+    monkeypatch.setattr(grid, "import_numpy", lambda: None)
+    cal = HTMLCalendar(firstweekday=6, country="US,JP", today=today)
+    assert cal.formatyearpage(2024, css=None, css_content="") == page
+
+
+def test_stream_yearpage():
+    cal = HTMLCalendar(firstweekday=6, startmonth=4, country="JP")
+    page = cal.formatyearpage(2023, encoding="ascii", holidays=True)
+    chunks = list(cal.iterformatyearpage(2023, encoding="ascii", holidays=True))
+    assert len(chunks) > 12
+    assert b"".join(chunks) == page
+    assert "&#26157;&#21644;&#12398;&#26085;".encode() in page  # 昭和の日
+
+    fh = io.BytesIO()
+    cal.writeyearpage(fh, 2023, encoding="ascii", holidays=True)
+    assert fh.getvalue() == page
+
+
+def test_month_cache():
+    today = datetime.date(2023, 5, 3)
+    cal = HTMLCalendar(
+        country="JP", today=today, visible_today=True, month_cache_size=24
+    )
+    page = cal.formatyear(2023)
+    assert cal.month_cache.info() == (0, 12, 24, 12)
+    assert cal.formatyear(2023) == page
+    assert cal.month_cache.hits == 12
+
+    # only the month containing today is re-rendered
+    cal.today = today + datetime.timedelta(days=1)
+    assert cal.formatyear(2023) != page
+    assert cal.month_cache.info() == (23, 13, 24, 13)
+
+    assert cal.invalidate_month_cache(month=5) == 2
+    assert cal.invalidate_month_cache() == 11
+    cal = HTMLCalendar(country="JP", today=today, visible_today=True)
+    assert cal.formatyear(2023) == page
+
+
+def test_text_calendar():
+    today = datetime.date(2023, 5, 3)
+    options = dict(firstweekday=6, startmonth=5, num_month=1, country="JP")
+    options.update(locale="C", today=today)
+    cal = TextCalendar(visible_holiday=True, visible_today=True, **options)
+    text = cal.formatyearpage(2023, width=1, encoding="utf-8").decode("utf-8")
+    lines = text.split("\n")
+    assert lines[2].strip() == "May"
+    assert lines[3] == "Sun Mon Tue Wed Thu Fri Sat"
+    assert lines[4] == "      1   2 { 3}( 4)( 5)  6"
+
+    cal = TextCalendar(color=True, **options)
+    text = cal.formatyearpage(2023, width=1, encoding="utf-8").decode("utf-8")
+    assert "\033[1;31m\033[7m 3\033[0m" in text
+
+
+def test_locale_names(monkeypatch):
+    cal = HTMLCalendar(country="US", locale="C")
+    assert cal.locale_names.month_name[5] == "May"
+
+    def fail(*args):
+        raise AssertionError("setlocale called")
+
+    # names are resolved once, rendering does not touch the locale
+    monkeypatch.setattr(locale, "setlocale", fail)
+    html = cal.formatyear(2023)
+    assert ">May<" in html
+    assert ">Mon<" in html
+
+
+def test_concurrent_render():
+    today = datetime.date(2023, 5, 3)
+    options = dict(country="JP", visible_holiday=True, visible_today=True)
+    jobs = [(year, startmonth) for year in range(1990, 2031) for startmonth in (1, 4)]
+
+    def render(cal, job):
+        year, startmonth = job
+        ctx = cal.make_context(startmonth=startmonth, today=today)
+        return cal.formatyearpage(year, encoding="utf-8", holidays=True, ctx=ctx)
+
+    serial = HTMLCalendar(**options)
+    expected = [render(serial, job) for job in jobs]
+
+    # one calendar and its holidays shared by all threads
+    cal = HTMLCalendar(month_cache_size=64, **options)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pages = list(executor.map(lambda job: render(cal, job), jobs))
+    assert pages == expected
+
+
+def test_holiday_base_between():
+    instance = Holidays()
+    assert instance.get_holiday_name(datetime.date(2000, 1, 1)) == "元日"
+    assert instance.get_holiday_name(datetime.date(1999, 1, 1)) == "元日"
+    # dates of years loaded before are still found
+    assert instance.get_holiday_name(datetime.date(2000, 1, 10)) == "成人の日"
+
+    start, end = datetime.date(1999, 12, 1), datetime.date(2001, 1, 8)
+    items = instance.between(start, end)
+    assert items[0] == (datetime.date(1999, 12, 23), "天皇誕生日")
+    assert items[-1] == (datetime.date(2001, 1, 1), "元日")
+    data = instance.get_by_years([1999, 2000, 2001])
+    assert items == [x for x in data if start <= x[0] < end]
+
+
+def test_syukujitsu_sidecar(tmp_path, monkeypatch):
+    csv_file = tmp_path / "syukujitsu.csv"
+    lines = ["国民の祝日・休日月日,国民の祝日・休日名称"]
+    lines += ["1955/1/1,元日", "1955/1/15,成人の日", "2023/1/1,元日", "2023/1/2,休日"]
+    csv_file.write_bytes("\r\n".join(lines).encode("cp932") + b"\r\n")
+
+    instance = Syukujitsu(str(csv_file))
+    assert instance.get_by_year(2023) == [
+        (datetime.date(2023, 1, 1), "元日"),
+        (datetime.date(2023, 1, 2), "休日"),
+    ]
+    assert (tmp_path / "syukujitsu.csv.bin").exists()
+
+    # the next instance maps the sidecar and does not parse the csv
+    def fail(self):
+        raise AssertionError("csv parsed")
+
+    monkeypatch.setattr(Syukujitsu, "parse_csv", fail)
+    instance = Syukujitsu(str(csv_file))
+    assert instance.get_holiday_name(datetime.date(1955, 1, 15)) == "成人の日"
+    assert instance.get_by_year(2000) == []
+    assert len(instance.get_data()) == 4
+
+
+def test_verify_diff_shard():
+    assert list(parse_year_range("1955-1957")) == [1955, 1956, 1957]
+    assert list(parse_year_range("2023")) == [2023]
+    day1, day2 = datetime.date(2023, 1, 1), datetime.date(2023, 1, 2)
+    results = [
+        {day1: ("元日", "元日"), day2: ("振替休日", "休日")},
+        {day1: ("元日", "元日"), day2: ("休日", "休日")},
+    ]
+    assert list(diff_shard(results)) == [(day2, ["振替休日", "休日"])]
+    assert list(diff_shard(results, normalize=True)) == []
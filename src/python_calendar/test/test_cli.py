@@ -0,0 +1,347 @@
+import datetime
+import json
+import os
+import pstats
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from python_calendar import assets, cli, export, watch
+from python_calendar.test import benchmark
+
+
+def test_render_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    output = tmp_path / "out" / "calendar.html"
+    args = ["-q", "-n", "-H", "--locale", "C", "-C", "US", "2023"]
+    args += ["-o", str(output)]
+
+    runner = CliRunner()
+    result = runner.invoke(cli.main, args)
+    assert result.exit_code == 0, result.output
+    content = output.read_bytes()
+    assert b"Martin Luther King Jr. Day" in content
+    assert len(list(tmp_path.glob(".cache/pycal/render/*.bin"))) == 1
+
+    # second run is served from the cache and leaves the output untouched
+    os.utime(output, (0, 0))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("calendar rendered")
+
+    monkeypatch.setattr(cli, "HTMLCalendar", fail)
+    result = runner.invoke(cli.main, args)
+    assert result.exit_code == 0, result.output
+    assert output.read_bytes() == content
+    assert output.stat().st_mtime == 0
+
+    result = runner.invoke(cli.main, args + ["--no-cache"])
+    assert isinstance(result.exception, AssertionError)
+
+
+# wall time budget in seconds of a warm-cache `pycal -t` run
+STARTUP_BUDGET = 1.5
+
+STARTUP_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+from python_calendar.cli import main
+main(sys.argv[1:], standalone_mode=False)
+elapsed = time.perf_counter() - started
+heavy = ["holidays", "pkg_resources", "numpy", "webbrowser", "http.server"]
+print(elapsed, *[name for name in heavy if name in sys.modules], file=sys.stderr)
+"""
+
+
+def run_startup_script(args, env):
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT] + args,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    elapsed, *modules = result.stderr.decode().split()
+    return float(elapsed), modules
+
+
+def test_startup_time(tmp_path):
+    src = str(Path(cli.__file__).parent.parent)
+    env = dict(os.environ, HOME=str(tmp_path), USERPROFILE=str(tmp_path))
+    env["PYTHONPATH"] = os.pathsep.join([src, env.get("PYTHONPATH", "")])
+    args = ["-t", "-q", "--locale", "C", "-C", "US", "2023"]
+
+    # the first run fills the render cache
+    _, modules = run_startup_script(args, env)
+    assert "holidays" in modules
+
+    elapsed, modules = run_startup_script(args, env)
+    assert modules == []
+    assert elapsed < STARTUP_BUDGET
+
+
+def test_benchmark(tmp_path):
+    output = tmp_path / "benchmark.json"
+    args = ["-k", "US.formatday", "-k", "cli.main", "--number", "1", "--repeat", "1"]
+    result = CliRunner().invoke(benchmark.main, args + ["-o", str(output)])
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert sorted(report["results"]) == ["US.formatday", "cli.main"]
+    assert report["results"]["cli.main"]["peak_bytes"] > 0
+
+    baseline = dict(report, results={"US.formatday": {"seconds": 1e-9}})
+    assert benchmark.compare(report, baseline)[0][0] == "US.formatday"
+    assert benchmark.compare(report, baseline, thresholds={"US.formatday": 1e9}) == []
+
+
+def test_timings_and_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    profile = tmp_path / "pycal.prof"
+    args = ["-n", "-H", "--no-cache", "--locale", "C", "-C", "JP", "2023"]
+    args += ["-o", str(tmp_path / "calendar.html")]
+    args += ["--timings", "--profile", str(profile)]
+    result = CliRunner().invoke(cli.main, args)
+    assert result.exit_code == 0, result.output
+    for phase in ["imports", "locale", "css", "holidays", "render html", "write"]:
+        assert re.search(r"^%s +[\d.]+ ms$" % phase, result.output, re.M), phase
+    # days are rendered from the month grid of the year, not by lookups
+    assert "month grid misses: 1\n" in result.output
+    assert "month grid hits: 11\n" in result.output
+    assert "holiday index hit rate: " in result.output
+    assert pstats.Stats(str(profile)).total_calls > 0
+
+
+def test_site(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    output = tmp_path / "site"
+    args = ["site", str(output), "--locale", "C", "-C", "US,NYSE", "--subdiv", "CA"]
+    args += ["--years", "2022-2023", "--workers", "1"]
+
+    runner = CliRunner()
+    result = runner.invoke(cli.main, args)
+    assert result.exit_code == 0, result.output
+    assert "6 pages rendered, 0 pages unchanged." in result.output
+    page = output / "default" / "US-CA" / "2023.html"
+    assert "César Chávez Day".encode() in page.read_bytes()
+    assert (
+        b'href="US-CA/index.html"' in (output / "default" / "index.html").read_bytes()
+    )
+    manifest = json.loads((output / "manifest.json").read_text())
+    assert len(manifest["pages"]) == 6
+
+    # nothing changed, today is not marked on these years
+    result = runner.invoke(cli.main, args + ["--mark-today"])
+    assert "0 pages rendered, 6 pages unchanged." in result.output
+
+    result = runner.invoke(cli.main, args + ["--style", "simple", "-q"])
+    assert result.exit_code == 0, result.output
+    assert (output / "simple" / "NYSE" / "2022.html").is_file()
+    assert b'href="simple/index.html"' in (output / "index.html").read_bytes()
+    manifest = json.loads((output / "manifest.json").read_text())
+    assert len(manifest["pages"]) == 12
+
+
+def test_css_asset(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    runner = CliRunner()
+    args = ["-H", "-n", "--no-cache", "--locale", "C", "-C", "US", "--css-asset"]
+    for name in ["a.html", "b.html"]:
+        result = runner.invoke(cli.main, args + ["-o", str(tmp_path / name), "2023"])
+        assert result.exit_code == 0, result.output
+    (asset,) = tmp_path.glob("calendar.*.css")
+    assert re.match(r"^calendar\.[0-9a-f]{8}\.css$", asset.name)
+    page = (tmp_path / "a.html").read_text()
+    assert '<link rel="stylesheet" type="text/css" href="%s" />' % asset.name in page
+    assert "<style>" not in page
+    with cli.get_css_stream("default") as stream:
+        css_content = stream.read().decode("utf-8")
+    assert asset.read_text() == assets.minify_css(css_content)
+
+    custom = tmp_path / "my.css"
+    custom.write_text("/* mine */\ntd.day {\n  color: blue;\n}\n")
+    args += ["--css", str(custom), "-o", str(tmp_path / "c.html"), "2023"]
+    assert runner.invoke(cli.main, args).exit_code == 0
+    (asset,) = tmp_path.glob("my.*.css")
+    assert asset.read_text() == "td.day{color:blue}\n"
+
+    output = tmp_path / "site"
+    args = ["site", str(output), "--locale", "C", "-C", "JP", "--years", "2023"]
+    args += ["-s", "default,simple", "--workers", "1", "--css-asset", "-q"]
+    assert runner.invoke(cli.main, args).exit_code == 0
+    names = sorted(x.name for x in (output / "assets").iterdir())
+    assert [x.split(".")[0] for x in names] == ["default", "simple"]
+    page = (output / "simple" / "JP" / "2023.html").read_text()
+    assert 'href="../../assets/%s"' % names[1] in page and "<style>" not in page
+
+
+def test_minify_css():
+    css = 'a:hover > b , c {\n  width: calc(1px + 2%);\n  content: "; /* x */ }" ;\n}\n'
+    assert (
+        assets.minify_css(css)
+        == 'a:hover>b,c{width:calc(1px + 2%);content:"; /* x */ }"}\n'
+    )
+
+
+def test_ics_export(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    output = tmp_path / "holidays.ics"
+    args = ["--locale", "C", "--financial", "NYSE", "--years", "1950-2100"]
+    args += ["-o", str(output), "-q"]
+
+    runner = CliRunner()
+    result = runner.invoke(cli.main, args + ["--no-cache"])
+    assert result.exit_code == 0, result.output
+    content = output.read_bytes()
+    assert content.startswith(b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+    assert content.endswith(b"END:VEVENT\r\nEND:VCALENDAR\r\n")
+    assert content.count(b"BEGIN:VEVENT") > 1000
+    assert b"UID:20230704-nyse@python-calendar\r\n" in content
+    assert max(len(line) for line in content.split(b"\r\n")) <= 75
+
+    # the same feed again, served from the render cache the second time
+    for _ in range(2):
+        result = runner.invoke(cli.main, args)
+        assert output.read_bytes() == content
+
+    result = runner.invoke(cli.main, ["--locale", "C", "-C", "US", "--years", "2023"])
+    assert result.exit_code == 1
+
+    for years in ("0-2", "9999"):
+        result = runner.invoke(cli.main, ["--format", "ics", "--years", years])
+        assert result.exit_code == 2
+        assert "is out of 1-9998" in result.output
+
+
+def test_ics_fold():
+    line = "SUMMARY:" + "祝日" * 30
+    folded = export.ics_fold(line)
+    lines = folded.encode("utf-8").split(b"\r\n")
+    assert max(len(x) for x in lines) <= 75
+    assert all(x.startswith(b" ") for x in lines[1:-1])
+    assert (
+        "".join(x[1:] if i else x for i, x in enumerate(folded.split("\r\n"))) == line
+    )
+    assert export.ics_escape("a, b; c\\d\ne") == r"a\, b\; c\\d\ne"
+
+
+def test_json_output(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    args = ["--locale", "C", "-C", "JP", "--no-cache", "-h"]
+
+    output = tmp_path / "calendar.json"
+    result = CliRunner().invoke(cli.main, args + ["-o", str(output), "-q", "2023"])
+    assert result.exit_code == 0, result.output
+    document = json.loads(output.read_text())
+    assert document["sources"] == [{"kind": "country", "code": "JP", "subdiv": None}]
+    assert [m["month"] for m in document["months"]] == list(range(1, 13))
+    may = document["months"][4]
+    assert may["weeks"][0][0] is None
+    assert may["weeks"][0][1] == {
+        "date": "2023-05-01",
+        "day": 1,
+        "weekday": 0,
+        "holiday": None,
+        "today": False,
+    }
+    assert ["2023-05-03", "憲法記念日"] in [
+        [h["date"], h["name"]] for h in document["holidays"]
+    ]
+
+    args += ["--format", "ndjson", "--years", "2022-2024"]
+    result = CliRunner(mix_stderr=False).invoke(cli.main, args)
+    assert result.exit_code == 0, result.stderr
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert records[0]["type"] == "calendar"
+    assert sum(r["type"] == "month" for r in records) == 36
+    assert records[-1]["type"] == "holiday"
+    assert records[-1]["date"].startswith("2024-")
+
+
+def test_bizday():
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.main, ["bizday", "-C", "JP", "check", "2023-05-02", "2023-05-03"]
+    )
+    assert result.exit_code == 1
+    assert result.output == "2023-05-02\tbusiness day\n2023-05-03\tholiday\t憲法記念日\n"
+
+    result = runner.invoke(
+        cli.main, ["bizday", "-C", "JP", "add", "-n", "1"], input="2023-05-02\n"
+    )
+    assert result.exit_code == 0
+    assert result.output == "2023-05-08\n"
+
+    result = runner.invoke(
+        cli.main, ["bizday", "-C", "JP", "between", "2023-05-01", "2023-06-01"]
+    )
+    assert result.output == "20\n"
+
+    result = runner.invoke(cli.main, ["bizday", "check", "2023-05-02"])
+    assert result.exit_code == 2
+
+    result = runner.invoke(
+        cli.main, ["bizday", "-C", "JP", "--years", "2023", "check", "2024-01-04"]
+    )
+    assert result.exit_code == 2
+    assert "out of range" in result.output
+
+
+def test_help():
+    runner = CliRunner()
+    result = runner.invoke(cli.main, ["--help"])
+    assert result.exit_code == 0
+    for command in ("bizday", "calendar", "serve", "site"):
+        assert "\n  %s " % command in result.output
+
+    # options of the default command
+    result = runner.invoke(cli.main, ["-t", "--help"])
+    assert result.exit_code == 0
+    assert "--first-weekday" in result.output
+
+
+def test_watch(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    output = tmp_path / "calendar.txt"
+    days = [datetime.date(2030, 5, 6), datetime.date(2030, 5, 7)]
+    pages = []
+
+    def fake_watch(on_change, paths):
+        assert paths == []
+        for day in days:
+            on_change(day, [])
+            pages.append(output.read_text())
+
+    poll = watch.watch
+    monkeypatch.setattr(watch, "watch", fake_watch)
+    args = ["-t", "--locale", "C", "-C", "US", "-o", str(output), "--watch", "2030"]
+    result = CliRunner().invoke(cli.main, args)
+    assert result.exit_code == 0, result.output
+    # the today marker moves at the date rollover
+    assert "[ 6]" in pages[0] and "[ 7]" not in pages[0]
+    assert "[ 7]" in pages[1] and "[ 6]" not in pages[1]
+
+    result = CliRunner().invoke(cli.main, ["-t", "--locale", "C", "--watch", "2030"])
+    assert result.exit_code == 1
+    assert "--watch option needs an output file" in result.output
+
+    # files and the date are polled
+    css = tmp_path / "calendar.css"
+    css.write_text("td {}")
+    clock = [datetime.date(2030, 5, 6)]
+    changes = []
+
+    def on_change(day, changed):
+        changes.append((day, changed))
+        if len(changes) == 1:
+            clock[0] = datetime.date(2030, 5, 7)
+
+    def stop():
+        if not changes:
+            css.write_text("td { color: red; }")
+        return len(changes) == 2
+
+    poll(on_change, [css], interval=0, today=lambda: clock[0], stop=stop)
+    assert changes == [(datetime.date(2030, 5, 6), [css]), (clock[0], [])]
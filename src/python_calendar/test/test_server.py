@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from python_calendar.aio import AsyncRenderer
+from python_calendar.server import CalendarServer
+
+
+@pytest.fixture
+def server():
+    httpd = CalendarServer(("127.0.0.1", 0), max_workers=2, quiet=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield "http://%s:%d" % httpd.server_address[:2]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url, **headers):
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers, exc.read()
+
+
+def test_serve(server):
+    status, headers, body = get(server + "/US/2023")
+    assert status == 200
+    assert b"Calendar for 2023" in body
+    assert b"Martin Luther King Jr. Day" in body
+    etag = headers["ETag"]
+
+    status, headers, body = get(server + "/US/2023", **{"If-None-Match": etag})
+    assert status == 304
+    assert body == b""
+
+    status, _, body = get(server + "/US/2023/holidays")
+    assert status == 200
+    assert b"Holidays for 2023" in body
+
+    status, _, body = get(server + "/NYSE/2023/4")
+    assert status == 200
+    assert b"Good Friday" in body
+    assert b"Christmas" not in body
+
+    assert get(server + "/XX/2023")[0] == 404
+    assert get(server + "/US/2023/13")[0] == 404
+    assert get(server + "/US/0000")[0] == 404
+    assert get(server + "/US/9999/holidays")[0] == 404
+    assert get(server + "/favicon.ico")[0] == 404
+
+
+def test_financial_subdiv():
+    httpd = CalendarServer(("127.0.0.1", 0), quiet=True)
+    try:
+        cal = httpd.get_calendar("NYSE", "A")
+        assert httpd.get_calendar("NYSE", "B") is cal
+        assert list(httpd.calendars) == [("NYSE", None)]
+    finally:
+        httpd.server_close()
+
+
+def test_async_render():
+    renders = []
+    gate = threading.Event()
+
+    async def main():
+        async with AsyncRenderer(max_workers=2) as renderer:
+            iterformatpage = renderer.iterformatpage
+
+            def counting_iterformatpage(year, *args):
+                renders.append(year)
+                for chunk in iterformatpage(year, *args):
+                    # the render of 2030 waits until it is cancelled
+                    gate.wait(5 if year == 2030 else 0)
+                    yield chunk
+
+            renderer.iterformatpage = counting_iterformatpage
+
+            # concurrent requests of a page share a render
+            pages = await asyncio.gather(
+                *[renderer.render_year(2023, country="US") for _ in range(5)]
+            )
+            assert renders == [2023]
+            assert len(set(pages)) == 1 and b"Calendar for 2023" in pages[0]
+            chunks = [x async for x in renderer.stream_year(2023, country="US")]
+            assert b"".join(chunks) == pages[0]
+            assert renders == [2023, 2023]
+
+            # the render stops when every waiter is cancelled
+            task = asyncio.ensure_future(renderer.render_year(2030, country="US"))
+            while not renders[2:]:
+                await asyncio.sleep(0.01)
+            (job,) = renderer.jobs.values()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert job.cancelled.is_set() and not renderer.jobs
+            gate.set()
+
+            with pytest.raises(NotImplementedError):
+                await renderer.render_year(2023, country="XX")
+
+    asyncio.run(main())
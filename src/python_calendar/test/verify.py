@@ -1,20 +1,61 @@
+import os
 import sys
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
 
 import click
-from prettytable import PrettyTable
 
+from ..util import parse_year_range
 from .holidays import Holidays, Syukujitsu
 
+# years of a shard, a task verifies one provider over one shard
+SHARD_YEARS = 10
 
-def verify(*, normalize=False):
+# provider instances of a worker process, built once per worker
+providers: Dict[type, object] = {}
+
+
+def get_provider(cls):
+    instance = providers.get(cls)
+    if instance is None:
+        instance = providers[cls] = cls()
+    return instance
+
+
+def load_shard(cls, years, normalize=False):
+    """
+    Return ({date: (name, normalized name)}, elapsed seconds) of a provider.
+    """
+    start = time.perf_counter()
+    instance = get_provider(cls)
+    result = {}
+    for dt, name in instance.get_by_years(years):
+        result[dt] = (name, instance.normalize_name(name) if normalize else name)
+    return result, time.perf_counter() - start
+
+
+def diff_shard(results, normalize=False):
+    """
+    Yield (date, [name, ...]) of dates the providers disagree on.
+    """
+    dates = sorted(set().union(*results))
+    i = 1 if normalize else 0
+    for dt in dates:
+        items = [r.get(dt, (None, None)) for r in results]
+        if len(set(x[i] for x in items)) != 1:
+            yield dt, [x[0] for x in items]
+
+
+def verify(*, normalize=False, years=range(1955, 2023 + 1), max_workers=None):
     """
     内閣府の提供する祝日データを元に holidays と jpholiday を検証します。
 
     normalize が True の場合は各パッケージの返す祝日の名前を一般化して比較します。
+    年の範囲を分割してプロセスプールで検証し、差分は見つかった順に出力します。
     """
 
-    years = list(range(1955, 2023 + 1))
     classes = [Syukujitsu, Holidays]
     try:
         __import__("jpholiday")
@@ -25,32 +66,45 @@ def verify(*, normalize=False):
 
         classes += [JPHoliday]
 
-    # {<datetime.date>: [S1, H1, J1, S2, H2, J2]}
-    # S1,H1,J1: original name. eg. "皇太子・皇太子徳仁親王の結婚の儀"
-    # S2,H2,J2: normalized name. eg. "結婚の儀"
-    name_by_date = defaultdict(lambda: [None] * (len(classes) * 2))
-
-    for i, cls in enumerate(classes):
-        instance = cls()
-        data = instance.get_by_years(years)
-        for item in data:
-            dt, name = item
-            name_by_date[dt][i] = name
-            if normalize:
-                name = instance.normalize_name(name)
-                name_by_date[dt][i + len(classes)] = name
-
-    table = PrettyTable()
-    table.field_names = ["Date"] + [cls.__name__ for cls in classes]
-
-    slicer = slice(len(classes), None) if normalize else slice(0, len(classes))
-
-    for dt, names in sorted(name_by_date.items(), key=lambda x: x[0]):
-        if len(set(names[slicer])) != 1:
-            value = [x if x is not None else "-" for x in names[: len(classes)]]
-            table.add_row([dt] + value)
-
-    print(table)
+    shards = [years[i : i + SHARD_YEARS] for i in range(0, len(years), SHARD_YEARS)]
+    elapsed = defaultdict(float)
+    start = time.perf_counter()
+    num_diff = 0
+
+    print(" | ".join(["Date"] + [cls.__name__ for cls in classes]), flush=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            [executor.submit(load_shard, cls, list(s), normalize) for cls in classes]
+            for s in shards
+        ]
+        # shards are printed in order as soon as every provider of it is done
+        for shard in futures:
+            results = []
+            for cls, future in zip(classes, shard):
+                result, seconds = future.result()
+                results.append(result)
+                elapsed[cls.__name__] += seconds
+            for dt, names in diff_shard(results, normalize):
+                value = [x if x is not None else "-" for x in names]
+                print(" | ".join([str(dt)] + value), flush=True)
+                num_diff += 1
+
+    for name, seconds in elapsed.items():
+        print(f"{name}: {seconds:.3f}s", file=sys.stderr)
+    print(
+        f"{num_diff} differences in {len(years)} years, {len(shards)} shards,"
+        f" {time.perf_counter() - start:.3f}s",
+        file=sys.stderr,
+    )
+    return num_diff
+
+
+def validate_years(ctx, param, value):
+    try:
+        return parse_year_range(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 @click.command()
@@ -61,8 +115,22 @@ def verify(*, normalize=False):
     default=False,
     help="validate with normalize holiday name",
 )
-def main(normalize):
-    verify(normalize=normalize)
+@click.option(
+    "--years",
+    default="1955-2023",
+    show_default=True,
+    callback=validate_years,
+    help="range of years to validate",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=os.cpu_count(),
+    show_default=True,
+    help="number of worker processes",
+)
+def main(normalize, years, workers):
+    verify(normalize=normalize, years=years, max_workers=workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+import codecs
+import sys
+
+from .calendar import HTMLCalendar
+from .util import center_width, display_width, truncate_width
+
+ANSI_RESET = "\033[0m"
+ANSI_HOLIDAY = "\033[1;31m"
+ANSI_TODAY = "\033[7m"
+# colors of weekday numbers (mon .. sun)
+ANSI_WEEKDAYS = ["", "", "", "", "", "\033[34m", "\033[31m"]
+
+
+class TextCalendar(HTMLCalendar):
+    """
+    This calendar returns text for terminals.
+
+    Holidays and today are colored with ANSI escapes if color is true,
+    otherwise marked as (1) and [1] by visible_holiday and visible_today
+    ({1} for a holiday which is today).
+    """
+
+    # space between months in a row
+    month_gap = "  "
+
+    def __init__(self, *args, color=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.color = color
+
+    @property
+    def day_width(self):
+        # markers take a column each side of the number
+        return 3 if self.color else 4
+
+    @property
+    def month_width(self):
+        return self.day_width * 7
+
+    def paint(self, text, *codes):
+        codes = "".join(c for c in codes if c)
+        if not self.color or not codes:
+            return text
+        return codes + text + ANSI_RESET
+
+    @property
+    def marks_today(self):
+        return super().marks_today or self.color
+
+    def month_cache_key(self, theyear, themonth, withyear=True, ctx=None):
+        key = super().month_cache_key(theyear, themonth, withyear, ctx)
+        return key + (self.color,)
+
+    def formatday(self, day, weekday, ctx, mask=None, is_today=None):
+        """
+        Return a day as a fixed width cell.
+        """
+        if day == 0:
+            # day outside month
+            return " " * self.day_width
+        if mask is None:
+            year, month, today = ctx.year, ctx.month, ctx.today
+            mask = ctx.holidays.lookup(month, day)[0]
+            is_today = day == today.day and month == today.month and year == today.year
+        text = str(day).rjust(2)
+
+        if self.color:
+            codes = [ANSI_HOLIDAY if mask else ANSI_WEEKDAYS[weekday]]
+            if is_today:
+                codes.append(ANSI_TODAY)
+            return self.paint(text, *codes) + " "
+
+        marks = " ", " "
+        holiday = mask and self.visible_holiday
+        today = is_today and self.visible_today
+        if holiday and today:
+            marks = "{", "}"
+        elif holiday:
+            marks = "(", ")"
+        elif today:
+            marks = "[", "]"
+        return marks[0] + text + marks[1]
+
+    def formatweek(self, theweek, ctx):
+        """
+        Return a complete week of month_weeks as a line.
+        """
+        return "".join(
+            self.formatday(d, wd, ctx, mask, today) for d, wd, mask, today in theweek
+        )
+
+    def formatweekday(self, day):
+        """
+        Return a weekday name as a fixed width cell.
+        """
+        name = truncate_width(self.locale_names.day_abbr[day], self.day_width - 1)
+        if self.color:
+            name = " " * (self.day_width - 1 - display_width(name)) + name + " "
+        else:
+            name = center_width(name, self.day_width)
+        return self.paint(name, ANSI_WEEKDAYS[day])
+
+    def formatweekheader(self):
+        """
+        Return a header for a week as a line.
+        """
+        return "".join(self.formatweekday(i) for i in self.iterweekdays())
+
+    def formatmonthname(self, theyear, themonth, withyear=True):
+        """
+        Return a month name as a centered line.
+        """
+        name = self.locale_names.month_name[themonth]
+        if withyear:
+            name = "%s %s" % (name, theyear)
+        return center_width(name, self.month_width)
+
+    def formatmonth_nocache(self, theyear, themonth, withyear=True, ctx=None):
+        """
+        Return a formatted month as lines of the same width.
+        """
+        ctx = self.make_month_context(theyear, themonth, ctx)
+        v = []
+        a = v.append
+        a(self.formatmonthname(theyear, themonth, withyear=withyear))
+        a(self.formatweekheader())
+
+        # 6 weeks so that months in a row line up
+        for week in self.month_weeks(theyear, themonth, ctx):
+            a(self.formatweek(week, ctx))
+        return "\n".join(v)
+
+    def formatholidays(self, theyear, ctx=None):
+        return "".join(
+            "%s  %s\n" % (d, name) for d, name in self.get_holiday_list(theyear, ctx)
+        )
+
+    def iterformatyear(self, theyear, width=3, ctx=None):
+        """
+        Yield a formatted year as text, one row of months at a time.
+        """
+        width = max(width, 1)
+        if ctx is None:
+            ctx = self.make_context()
+        self.prepare_holidays(theyear, ctx)
+        row_width = self.month_width * width + len(self.month_gap) * (width - 1)
+        yield center_width(str(theyear), row_width).rstrip() + "\n"
+
+        for i in range(ctx.startmonth, ctx.startmonth + ctx.num_month, width):
+            months = [((x - 1) % 12) + 1 for x in range(i, i + width)]
+            blocks = []
+            for m in months:
+                y = theyear + 1 if m < ctx.startmonth else theyear
+                month = self.formatmonth(y, m, withyear=False, ctx=ctx)
+                blocks.append(month.split("\n"))
+            lines = [self.month_gap.join(line).rstrip() for line in zip(*blocks)]
+            while not lines[-1]:
+                lines.pop()
+            yield "\n" + "\n".join(lines) + "\n"
+
+    def iterformatyearpage(
+        self,
+        theyear,
+        width=3,
+        encoding=None,
+        holidays=False,
+        calendar=True,
+        ctx=None,
+        **kwargs,
+    ):
+        """
+        Yield a formatted year as encoded chunks of text.
+        Other keyword arguments of HTMLCalendar.iterformatyearpage are ignored.
+        """
+        if encoding is None:
+            encoding = sys.getdefaultencoding()
+        encoder = codecs.getincrementalencoder(encoding)("replace")
+        if calendar:
+            for fragment in self.iterformatyear(theyear, width, ctx):
+                yield encoder.encode(fragment)
+        if holidays:
+            if calendar:
+                yield encoder.encode("\n")
+            yield encoder.encode(self.formatholidays(theyear, ctx))
+        yield encoder.encode("", final=True)
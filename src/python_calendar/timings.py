@@ -0,0 +1,140 @@
+import time
+from contextlib import contextmanager
+
+
+class Timings:
+    """
+    Wall time of named phases and event counters, reported by pycal --timings.
+
+    Time spent in a nested phase is not counted in the enclosing phase,
+    so the phases add up to the measured total.
+    """
+
+    def __init__(self):
+        # {name: seconds} in the order phases were first entered
+        self.phases = {}
+        self.counters = {}
+        self.stack = []
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def phase(self, name):
+        # [name, started, seconds of nested phases]
+        frame = [name, time.perf_counter(), 0.0]
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.add(name, elapsed - frame[2])
+            if self.stack:
+                self.stack[-1][2] += elapsed
+
+    def iter_timed(self, name, iterable):
+        """
+        Iterate iterable, counting the time to produce items as phase name.
+        """
+        it = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def format(self, total=None):
+        """
+        Return the report as lines.
+        """
+        lines = []
+        width = max([len(name) for name in self.phases] + [len("total")])
+        for name, seconds in self.phases.items():
+            lines.append("%-*s %9.2f ms" % (width, name, seconds * 1000))
+        if total is not None:
+            lines.append("%-*s %9.2f ms" % (width, "total", total * 1000))
+        for name, value in self.counters.items():
+            lines.append("%s: %s" % (name, value))
+        # "<cache> hits" and "<cache> misses" counters are summarized as a rate
+        caches = [n.rsplit(" ", 1)[0] for n in self.counters if n.endswith(" misses")]
+        caches += [n.rsplit(" ", 1)[0] for n in self.counters if n.endswith(" hits")]
+        for cache in dict.fromkeys(caches):
+            hits = self.counters.get(cache + " hits", 0)
+            misses = self.counters.get(cache + " misses", 0)
+            lines.append("%s hit rate: %s" % (cache, hit_rate(hits, misses)))
+        return lines
+
+
+def hit_rate(hits, misses):
+    """
+    Return "hits/lookups (rate%)".
+    """
+    lookups = hits + misses
+    if not lookups:
+        return "0/0"
+    return "%d/%d (%.1f%%)" % (hits, lookups, hits * 100 / lookups)
+
+
+class CountingHolidayIndex:
+    """
+    HolidayIndex wrapper counting lookups and holidays found.
+    """
+
+    def __init__(self, index, timings):
+        self.index = index
+        self.timings = timings
+
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, month, day):
+        name = self.index.get(month, day)
+        self.timings.count("holiday lookups")
+        if name is not None:
+            self.timings.count("holidays found")
+        return name
+
+    def lookup(self, month, day):
+        mask, name = self.index.lookup(month, day)
+        self.timings.count("holiday lookups")
+        if name is not None:
+            self.timings.count("holidays found")
+        return mask, name
+
+
+def instrument_calendar(cal, timings):
+    """
+    Count holiday index and month grid builds and lookups of cal into timings.
+    """
+    get_holiday_index = cal.get_holiday_index
+
+    def counting_get_holiday_index(year):
+        if year in cal.holiday_indexes:
+            timings.count("holiday index hits")
+        else:
+            timings.count("holiday index misses")
+        return CountingHolidayIndex(get_holiday_index(year), timings)
+
+    cal.get_holiday_index = counting_get_holiday_index
+
+    get_year_grid = cal.get_year_grid
+
+    def counting_get_year_grid(theyear, today=None):
+        misses = cal.grid_cache.misses
+        grid = get_year_grid(theyear, today)
+        if cal.grid_cache.misses == misses:
+            timings.count("month grid hits")
+        else:
+            timings.count("month grid misses")
+        return grid
+
+    cal.get_year_grid = counting_get_year_grid
@@ -1,7 +1,13 @@
+import datetime
+import filecmp
 import ntpath
 import os
 import posixpath
+import sys
+import unicodedata
+from contextlib import contextmanager
 from pathlib import Path, PurePath, PurePosixPath, PureWindowsPath
+from tempfile import NamedTemporaryFile
 
 
 def dot_path(pathname):
@@ -25,3 +31,70 @@ def dot_path(pathname):
         return posixpath.join(".", pathname)
 
     return os.path.join(".", pathname)
+
+
+def display_width(text):
+    """Return the number of terminal columns used by text."""
+    return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+
+
+def truncate_width(text, width):
+    """Return the longest prefix of text fitting in width columns."""
+    for i in range(len(text), -1, -1):
+        if display_width(text[:i]) <= width:
+            return text[:i]
+    return ""
+
+
+def center_width(text, width):
+    """Center text in width terminal columns."""
+    space = max(width - display_width(text), 0)
+    left = space // 2
+    return " " * left + text + " " * (space - left)
+
+
+def parse_year_range(value):
+    """
+    Parse "2000-2030" or "2023" into a range of years.
+    A range ends on January 1st of the next year, so the last year must be
+    before datetime.MAXYEAR.
+    """
+    first, _, last = value.partition("-")
+    try:
+        first = int(first)
+        last = int(last) if last else first
+    except ValueError:
+        raise ValueError(f"invalid year range: {value}")
+    if first > last:
+        raise ValueError(f"invalid year range: {value}")
+    if first < datetime.MINYEAR or last >= datetime.MAXYEAR:
+        raise ValueError(
+            f"year range {value} is out of {datetime.MINYEAR}-{datetime.MAXYEAR - 1}"
+        )
+    return range(first, last + 1)
+
+
+@contextmanager
+def open_for_write_binary(filename):
+    if filename == "-":
+        yield sys.stdout.buffer
+    else:
+        folder = Path(filename).parent
+        folder.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(dir=folder, delete=False, mode="w+b") as tmp:
+            try:
+                yield tmp
+            except BaseException:
+                # do not leave a partially written file behind
+                tmp.close()
+                Path(tmp.name).unlink(missing_ok=True)
+                raise
+            tmp.close()
+            if Path(filename).is_file() and filecmp.cmp(
+                tmp.name, filename, shallow=False
+            ):
+                # keep the mtime of unchanged output
+                Path(tmp.name).unlink()
+            else:
+                Path(filename).unlink(missing_ok=True)
+                Path(tmp.name).rename(filename)
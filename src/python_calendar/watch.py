@@ -0,0 +1,42 @@
+import datetime
+import os
+import time
+
+# seconds between polls of the watched files and the date
+WATCH_INTERVAL = 1.0
+
+
+def file_state(path):
+    """
+    Return (mtime, size) of path, or None if it does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def watch(on_change, paths=(), interval=WATCH_INTERVAL, today=None, stop=None):
+    """
+    Call on_change(day, [changed path, ...]) when a file of paths changes or
+    at the date rollover, until stop() returns true.
+
+    today is a function returning the current date, datetime.date.today by
+    default.
+    """
+    today = today or datetime.date.today
+    states = {path: file_state(path) for path in paths}
+    day = today()
+    while not (stop and stop()):
+        time.sleep(interval)
+        changed = []
+        for path in paths:
+            state = file_state(path)
+            if state != states[path]:
+                states[path] = state
+                changed.append(path)
+        new_day = today()
+        if changed or new_day != day:
+            day = new_day
+            on_change(day, changed)